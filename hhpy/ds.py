@@ -11,23 +11,25 @@ import numpy as np
 import pandas as pd
 import warnings
 import os
+import functools
+import hashlib
 
 # --- third party imports
 from copy import deepcopy
 from scipy import stats, signal
-from scipy.spatial import distance
-from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error, median_absolute_error
-from sklearn.preprocessing import StandardScaler
+from scipy.linalg import cho_factor, cho_solve
+from sklearn.metrics import r2_score
 from typing import Mapping, Sequence, Callable, Union, List, Optional, Tuple, Any
 from io import StringIO
 from datetime import datetime
 from docrep import DocstringProcessor
+from joblib import Parallel, delayed
 
 # --- local imports
 from hhpy.main import export, BaseClass, assert_list, tprint, progressbar, qformat, list_intersection, round_signif, \
     is_list_like, dict_list, append_to_dict_list, concat_cols, reformat_string, dict_inv, \
     list_exclude, docstr as docstr_main, SequenceOfScalars, SequenceOrScalar, STRING_NAN, is_scalar, GROUPBY_DUMMY, \
-    assert_scalar, list_merge
+    assert_scalar, list_merge, list_unique
 
 # ---- variables
 # --- constants
@@ -77,6 +79,14 @@ dtypes = {
 dtypes['Iint'] = dtypes['Int'] + dtypes['int']
 dtypes['number'] = dtypes['Iint'] + dtypes['float']
 dtypes['datetime64'] = dtypes['datetime']
+# numpy dtypes used for downcasting, ordered from smallest to largest
+downcast_dtypes = {
+    'unsigned': [np.uint8, np.uint16, np.uint32, np.uint64],
+    'signed': [np.int8, np.int16, np.int32, np.int64],
+    'float': [np.float32, np.float64]
+}
+# absolute tolerance by itemsize a downcast float column has to stay within (same as pd.to_numeric)
+downcast_float_atol = {4: 5e-4, 8: 5e-8}
 
 
 # ---- classes
@@ -399,7 +409,7 @@ class DFMapping(BaseClass):
 # ---- functions
 # --- export
 @export
-def assert_df(df: Any, groupby: Union[SequenceOrScalar, bool] = False, name: str = 'df',
+def assert_df(df: Any, groupby: Union[SequenceOrScalar, bool] = False, name: str = 'df', copy: bool = True
               ) -> Union[pd.DataFrame, Tuple[pd.DataFrame, List]]:
     """
     assert that input is a pandas DataFrame, raise ValueError if it cannot be cast to DataFrame
@@ -407,11 +417,13 @@ def assert_df(df: Any, groupby: Union[SequenceOrScalar, bool] = False, name: str
     :param df: Object to be cast to DataFrame
     :param groupby: column to use as groupby
     :param name: name to use in the ValueError message, useful when calling from another function
+    :param copy: Whether to return a (deep) copy. Set to False if the caller does not modify the DataFrame inplace,
+        new columns (like the groupby dummy) are then added to a shallow copy [optional]
     :return: pandas DataFrame
     """
 
     try:
-        df = pd.DataFrame(df).copy()
+        df = pd.DataFrame(df).copy(deep=copy)
     except Exception as _e:
         print(f"{_e.__class__.__name__}: {_e}")
         raise ValueError(
@@ -426,7 +438,8 @@ def assert_df(df: Any, groupby: Union[SequenceOrScalar, bool] = False, name: str
         groupby = assert_list(groupby)
 
     # drop duplicate columns
-    df = drop_duplicate_cols(df)
+    if df.columns.has_duplicates:
+        df = drop_duplicate_cols(df)
 
     return df, groupby
 
@@ -449,15 +462,31 @@ def optimize_pd(df: pd.DataFrame, c_int: bool = True, c_float: bool = True, c_ca
     """
     # -- func
     # noinspection PyShadowingNames
-    def _do_downcast(df, cols, downcast):
-        if downcast is None:
+    def _do_downcast(df, col, downcast):
+        _arr = df[col].to_numpy()
+        if downcast == 'float':
+            # missing and infinite values are representable by any float dtype
+            _arr = _arr[np.isfinite(_arr)]
+        # nothing to downcast for empty columns
+        if _arr.size == 0:
             return df
-        for _col in assert_list(cols):
-            # downcast
-            try:
-                df[_col] = pd.to_numeric(df[_col], downcast=downcast)
-            except Exception as _e:
-                print(f"Downcast Error in {_col} - {_e.__class__}: {_e}")
+        # get the numeric range directly from the underlying array
+        _min = _arr.min()
+        _max = _arr.max()
+        if downcast == 'integer':
+            # split integer columns in unsigned (all non negative) and signed
+            downcast = 'unsigned' if _min >= 0 else 'signed'
+        # cast to the smallest dtype whose range fits the data
+        for _dtype in downcast_dtypes[downcast]:
+            _info = np.finfo(_dtype) if downcast == 'float' else np.iinfo(_dtype)
+            if _info.min <= _min and _max <= _info.max:
+                # floats must also keep their precision, otherwise try the next larger dtype
+                if downcast == 'float' and not np.allclose(
+                        _arr.astype(_dtype), _arr, rtol=0., atol=downcast_float_atol[np.dtype(_dtype).itemsize]):
+                    continue
+                if _dtype != df[col].dtype:
+                    df[col] = df[col].astype(_dtype, copy=False)
+                break
         return df
 
     # -- init
@@ -470,11 +499,10 @@ def optimize_pd(df: pd.DataFrame, c_int: bool = True, c_float: bool = True, c_ca
     if not _pandas_version_1_plus:
         convert_dtypes = False
 
-    # check for duplicate columns
-    _duplicate_columns = get_duplicate_cols(df)
-    if len(_duplicate_columns) > 0:
-        warnings.warn('duplicate columns found: {}'.format(_duplicate_columns))
-        df = drop_duplicate_cols(df)
+    # check for duplicate columns (has_duplicates is cached on the columns Index)
+    if df.columns.has_duplicates:
+        warnings.warn('duplicate columns found: {}'.format(get_duplicate_cols(df)))
+        df = drop_duplicate_cols(df, warn=False)
 
     # if applicable: drop columns containing only na
     if drop_all_na_cols:
@@ -491,36 +519,28 @@ def optimize_pd(df: pd.DataFrame, c_int: bool = True, c_float: bool = True, c_ca
 
     # casting
     if c_int:
-        _include = dtypes['int']
-        # Int does not support downcasting as of pandas 1.0.0 -> check again later
-        # if _pandas_version_1_plus:
-        #     _include += dtypes_Int
-        _cols_int = df.select_dtypes(include=_include)
-        # loop int columns
-        for _col in _cols_int:
-            # split integer columns in unsigned (all positive) and (unsigned)
-            if df[_col].isna().sum() > 0:
-                _downcast = None
-            elif (df[_col] > 0).all():
-                _downcast = 'unsigned'
-            else:
-                _downcast = 'signed'
-            df = _do_downcast(df=df, cols=_col, downcast=_downcast)
+        # Int does not support downcasting as of pandas 1.0.0 -> only numpy ints are considered
+        for _col in df.select_dtypes(include=dtypes['int']).columns:
+            df = _do_downcast(df=df, col=_col, downcast='integer')
 
     if c_float:
-        df = _do_downcast(df=df, cols=df.select_dtypes(
-            include=['float']).columns, downcast='float')
+        for _col in df.select_dtypes(include=['float']).columns:
+            df = _do_downcast(df=df, col=_col, downcast='float')
 
     if c_cat:
         _include = ['object']
         if _pandas_version_1_plus:
             _include += ['string']
+        _cat_cols = {}
         for _col in df.select_dtypes(include=_include).columns:
             # if there are less than 1 - cat_frac unique elements: cast to category
-            _count_unique = df[_col].dropna().drop_duplicates().shape[0]
-            _count_no_na = df[_col].dropna().shape[0]
-            if _count_no_na > 0 and (_count_unique / _count_no_na < (1 - cat_frac)):
-                df[_col] = df[_col].astype('category')
+            _count_no_na = df[_col].count()
+            if _count_no_na > 0 and (df[_col].nunique() / _count_no_na < (1 - cat_frac)):
+                _cat_cols[_col] = df[_col].astype('category')
+        # assign all categorical columns at once
+        if _cat_cols:
+            df = pd.DataFrame({_col: _cat_cols.get(_col, df[_col]) for _col in df.columns}, index=df.index,
+                              columns=df.columns, copy=False)
 
     # call convert dtypes to handle downcasted dtypes
     if convert_dtypes:
@@ -542,13 +562,14 @@ def get_df_corr(df: pd.DataFrame, columns: List[str] = None, target: str = None,
 
     :param df: input pandas DataFrame. Other objects are implicitly cast to DataFrame
     :param columns: Column to calculate the correlation for, defaults to all numeric columns [optional]
-    :param target: Returns only correlations that involve the target column [optional]
+    :param target: Returns only correlations that involve the target column (in col_0), only these correlations are
+        calculated [optional]
     :param groupby: Returns correlations for each level of the group [optional]
     :return: pandas DataFrame containing all pearson correlations in a melted format
     """
     # -- assert
-    # df / groupby
-    df, groupby = assert_df(df=df, groupby=groupby)
+    # df / groupby (df is not modified inplace -> no need to copy)
+    df, groupby = assert_df(df=df, groupby=groupby, copy=False)
     # -- init
     # if there is a column called index it will create problems so rename it to '__index__'
     df = df.rename({'index': '__index__'}, axis=1)
@@ -556,30 +577,33 @@ def get_df_corr(df: pd.DataFrame, columns: List[str] = None, target: str = None,
     if columns is None:
         columns = df.select_dtypes(include=np.number).columns
 
+    # groupby columns are identifiers and not part of the correlation matrix
+    columns = [_ for _ in columns if _ not in groupby]
+    _n = len(columns)
+
     # -- main
-    # init df as list of dfs
-    _df_corr = []
-    # loop groups
-    for _index, _df_i in df.groupby(groupby):
-        # get corr
-        _df_corr_i = _df_i.corr().reset_index().rename(
-            {'index': 'col_0'}, axis=1)
-        # set upper right half to nan
-        for _i, _col in enumerate(columns):
-            _df_corr_i[_col] = np.where(
-                _df_corr_i[_col].index <= _i, np.nan, _df_corr_i[_col])
+    if target is not None:
+        # only the correlations involving the target are needed -> corrwith instead of the full matrix
+        _df_corr = df.groupby(groupby)[[_ for _ in columns if _ != target]].corrwith(df[target])
+        _df_corr.columns.name = 'col_1'
+        # gather / melt, stack drops correlations that could not be calculated
+        _df_corr = _df_corr.stack().rename('corr').reset_index()
+        _df_corr.insert(len(groupby), 'col_0', target)
+    else:
+        # get corr for all groups at once, index is (*groupby, col_0)
+        _df_corr = df.groupby(groupby)[columns].corr()
+        # keep only the lower left half (excluding self correlation) by gathering it from the stacked matrices
+        _rows, _cols = np.tril_indices(_n, k=-1)
+        _corr = _df_corr.to_numpy().reshape(-1, _n, _n)[:, _rows, _cols]
         # gather / melt
-        _df_corr_i = pd.melt(_df_corr_i, id_vars=[
-                             'col_0'], var_name='col_1', value_name='corr').dropna()
-        # drop self correlation
-        _df_corr_i = _df_corr_i[_df_corr_i['col_0'] != _df_corr_i['col_1']]
-        # get identifier
-        for _groupby in groupby:
-            _df_corr_i[_groupby] = _df_i[_groupby].iloc[0]
-        # append to list of dfs
-        _df_corr.append(_df_corr_i)
-    # merge
-    _df_corr = concat(_df_corr)
+        _keys = _df_corr.index.droplevel(-1)[::_n].repeat(len(_rows))
+        _keys.names = groupby
+        _df_corr = _keys.to_frame(index=False)
+        _df_corr['col_0'] = np.tile(np.asarray(columns, dtype=object)[_rows], _corr.shape[0])
+        _df_corr['col_1'] = np.tile(np.asarray(columns, dtype=object)[_cols], _corr.shape[0])
+        _df_corr['corr'] = _corr.ravel()
+        # drop correlations that could not be calculated
+        _df_corr = _df_corr[~np.isnan(_df_corr['corr'].to_numpy())]
 
     # clean dummy groupby
     if GROUPBY_DUMMY in _df_corr.columns:
@@ -588,17 +612,6 @@ def get_df_corr(df: pd.DataFrame, columns: List[str] = None, target: str = None,
         # move groupby columns to front
         _df_corr = col_to_front(_df_corr, groupby)
 
-    # reorder and keep only columns involving the target (if applicable)
-    if target is not None:
-        # if the target is col_1: switch it to col_0
-        _target_is_col_1 = (_df_corr['col_1'] == target)
-        _df_corr['col_1'] = np.where(
-            _target_is_col_1, _df_corr['col_0'], _df_corr['col_1'])
-        _df_corr['col_0'] = np.where(
-            _target_is_col_1, target, _df_corr['col_0'])
-        # keep only target in col_0
-        _df_corr = _df_corr[_df_corr['col_0'] == target]
-
     # get absolute correlation
     _df_corr['corr_abs'] = np.abs(_df_corr['corr'])
     # sort descending
@@ -616,8 +629,13 @@ def drop_zero_cols(df: pd.DataFrame) -> pd.DataFrame:
     :param df: pandas DataFrame
     :return: pandas DataFrame without 0 columns.
     """
-    # noinspection PyUnresolvedReferences
-    return df[df.columns[(df != 0).any()]]
+    # non numeric columns cannot be 0 -> keep them, numeric columns are checked on one float array
+    _is_numeric = np.array([pd.api.types.is_numeric_dtype(_dtype) for _dtype in df.dtypes], dtype=bool)
+    _keep = np.ones(df.shape[1], dtype=bool)
+    if _is_numeric.any():
+        _keep[_is_numeric] = np.any(df.iloc[:, _is_numeric].to_numpy(dtype=float, na_value=np.nan) != 0, axis=0)
+
+    return df.iloc[:, _keep]
 
 
 @export
@@ -651,7 +669,7 @@ def drop_duplicate_indices(df: pd.DataFrame, warn: bool = True) -> pd.DataFrame:
     :param warn: Whether to trigger a warning if duplicate indices are dropped
     :return: pandas DataFrame without the duplicates indices
     """
-    if warn:
+    if warn and df.index.has_duplicates:
         _duplicate_indices = get_duplicate_indices(df).tolist()
         if _duplicate_indices:
             print(f"Dropping duplicate indices: {_duplicate_indices}")
@@ -667,7 +685,7 @@ def drop_duplicate_cols(df: pd.DataFrame, warn: bool = True) -> pd.DataFrame:
     :param warn: Whether to trigger a warning if duplicate columns are dropped
     :return: pandas DataFrame without the duplicates columns
     """
-    if warn:
+    if warn and df.columns.has_duplicates:
         _duplicate_cols = get_duplicate_cols(df).tolist()
         if _duplicate_cols:
             warnings.warn(f"Dropping duplicate columns: {_duplicate_cols}")
@@ -684,7 +702,14 @@ def change_span(s: pd.Series, steps: int = 5) -> pd.Series:
     :param steps: number of steps around the changepoint to flag as true
     :return: pandas Series of dtype Boolean
     """
-    return pd.Series(s.shift(-steps).ffill() != s.shift(steps).bfill())
+    _s = pd.Series(s)
+    _values = _s.to_numpy()
+    # compare the value steps before with the value steps after, clipping at the first / last value
+    _index = np.arange(_values.shape[0])
+    _values_prev = _values[np.clip(_index - steps, 0, None)]
+    _values_next = _values[np.clip(_index + steps, None, _values.shape[0] - 1)]
+
+    return pd.Series(_values_next != _values_prev, index=_s.index, name=_s.name)
 
 
 @export
@@ -701,36 +726,96 @@ def outlier_to_nan(df: pd.DataFrame, col: str, groupby: Union[list, str] = None,
     :param do_print: whether to print steps to console
     :return: pandas Series with outliers set to nan
     """
-    df, groupby = assert_df(df=df, groupby=groupby)
+    # -- func
+    def _outlier_rep(_values, _starts, _ends):
+        # _values is sorted by group, group i spans _starts[i]:_ends[i]
+        _n = _values.shape[0]
+        _pos = np.arange(_n)
+        _lengths = _ends - _starts
+        _group_start = np.repeat(_starts, _lengths)
+        _group_end = np.repeat(_ends, _lengths)
+        _valid = ~np.isnan(_values)
+
+        # use (linear, forward) interpolation to treat missing values
+        _prev = np.maximum.accumulate(np.where(_valid, _pos, -1))
+        _next = np.minimum.accumulate(np.where(_valid, _pos, _n)[::-1])[::-1]
+        _has_prev = ~_valid & (_prev >= _group_start)
+        _has_next = _has_prev & (_next < _group_end)
+        _prev = np.where(_has_prev, _prev, 0)
+        _next = np.where(_has_next, _next, 0)
+        _values = np.where(_has_prev, _values[_prev], _values)
+        _values = np.where(
+            _has_next, _values + (_values[_next] - _values) * (_pos - _prev) / np.where(_has_next, _next - _prev, 1),
+            _values)
+
+        # calculate delta (mean of diff to previous and next value within the group)
+        _values_prev = np.roll(_values, 1)
+        _values_prev[_starts] = _values[_starts]
+        _values_next = np.roll(_values, -1)
+        _values_next[_ends - 1] = _values[_ends - 1]
+        _values_prev = np.where(np.isnan(_values_prev), _values, _values_prev)
+        _values_next = np.where(np.isnan(_values_next), _values, _values_next)
+        _delta = .5 * (np.abs(_values - _values_prev) + np.abs(_values - _values_next))
+
+        # mean and std (ddof=1) of delta by group, ignoring missing values
+        _delta_valid = ~np.isnan(_delta)
+        # count and sum in a single reduction over both columns
+        _count, _sum = np.add.reduceat(
+            np.column_stack([_delta_valid, np.where(_delta_valid, _delta, 0)]), _starts, axis=0).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            _mean = np.repeat(_sum / _count, _lengths)
+            _std = np.add.reduceat(np.where(_delta_valid, (_delta - _mean) ** 2, 0), _starts) / (_count - 1)
+            _std = np.repeat(np.sqrt(_std), _lengths)
+            # keep only values whose delta is within the std range
+            return np.where(np.abs(_delta - _mean) <= std_cutoff * _std, _values, np.nan)
 
+    # -- init
+    # only the filtered column is copied (to a numpy array)
+    df, groupby = assert_df(df=df, groupby=groupby, copy=False)
+
+    # sort once by group (stable to keep the row order within each group)
+    _groups = df.groupby(groupby, sort=False).ngroup().to_numpy()
+    _order = np.argsort(_groups, kind='stable')
+    _groups = _groups[_order]
+    _values = df[col].to_numpy(dtype=float)[_order]
+    # rows with missing group keys are not part of any group
+    _values[_groups < 0] = np.nan
+    _starts = np.flatnonzero(np.r_[True, np.diff(_groups) != 0])
+    _ends = np.r_[_starts[1:], _groups.shape[0]]
+
+    # -- main
     for _rep in range(reps):
 
         if do_print:
             tprint('rep = ' + str(_rep + 1) + ' of ' + str(reps))
 
-        # grouped by df
-        _df_grouped = df.groupby(groupby)
+        if _values.shape[0] > 0:
+            _values = _outlier_rep(_values, _starts, _ends)
 
-        # use interpolation to treat missing values
-        df[col] = _df_grouped[col].transform(pd.DataFrame.interpolate)
+    # back to original row order
+    _out = np.empty_like(_values)
+    _out[_order] = _values
 
-        # calculate delta (mean of diff to previous and next value)
-        _delta = .5 * (
-            (df[col] - _df_grouped[col].shift(1).bfill()).abs() +
-            (df[col] - _df_grouped[col].shift(-1).ffill()).abs()
-        )
+    return pd.Series(_out, index=df.index, name=col)
 
-        df[col] = df[col].where(
-            (_delta - _df_grouped[col].mean()).abs() <= (std_cutoff * _df_grouped[col].std()))
 
-    if GROUPBY_DUMMY in df.columns:
-        df = df.drop(GROUPBY_DUMMY, axis=1)
+@functools.lru_cache(maxsize=32)
+def _butter_sos(cutoff: Union[float, Tuple[float, ...]], fs: float, order: int, btype: str = None) -> np.ndarray:
+    # the filter coefficients only depend on the filter params -> cache them across calls / groups
+    # (cutoff is a float or a tuple of floats for band filters so it can be hashed)
+    if btype is None:
+        btype = 'lowpass'
+    _nyq = 0.5 * fs
+    _normal_cutoff = np.asarray(cutoff) / _nyq
+    # second order sections are numerically more stable than (b, a) coefficients
+    _sos = signal.butter(order, _normal_cutoff, btype=btype, analog=False, output='sos')
 
-    return df[col]
+    return _sos
 
 
 @export
-def butter_pass_filter(data: pd.Series, cutoff: int, fs: int, order: int, btype: str = None, shift: bool = False):
+def butter_pass_filter(data: pd.Series, cutoff: int, fs: int, order: int, btype: str = None, shift: bool = False,
+                       zero_phase: bool = False):
     """
     Implementation of a highpass / lowpass filter using scipy.signal.butter
 
@@ -741,40 +826,41 @@ def butter_pass_filter(data: pd.Series, cutoff: int, fs: int, order: int, btype:
     :param btype: The type of filter. Passed to scipy.signal.butter.  Default is ‘lowpass’.
         One of {‘lowpass’, ‘highpass’, ‘bandpass’, ‘bandstop’}
     :param shift: whether to shift the data to start at 0
+    :param zero_phase: whether to apply the filter forward and backward (scipy.signal.sosfiltfilt) to avoid a phase
+        shift, by default the filter is applied forward only [optional]
     :return: 1d numpy array containing the filtered data
     """
 
-    def _f_butter_pass(_f_cutoff, _f_fs, _f_order, _f_btype):
-        _nyq = 0.5 * _f_fs
-        _normal_cutoff = _f_cutoff / _nyq
-        # noinspection PyTupleAssignmentBalance
-        __b, __a = signal.butter(
-            _f_order, _normal_cutoff, btype=_f_btype, analog=False, output='ba')
-
-        return __b, __a
-
-    _data = np.array(data)
+    # no copy if the data already is a contiguous float array
+    _data = np.ascontiguousarray(data, dtype=np.float64)
 
     if shift:
-        _shift = pd.Series(data).iloc[0]
+        _shift = _data[0]
+        _data = _data - _shift
     else:
         _shift = 0
 
-    _data -= _shift
-
-    _b, _a = _f_butter_pass(_f_cutoff=cutoff, _f_fs=fs,
-                            _f_order=order, _f_btype=btype)
+    # band filters have two cutoffs: pass them as a (hashable) tuple
+    if np.ndim(cutoff) > 0:
+        _cutoff = tuple(float(_) for _ in np.ravel(cutoff))
+    else:
+        _cutoff = float(cutoff)
+    _sos = _butter_sos(cutoff=_cutoff, fs=fs, order=order, btype=btype)
 
-    _y = signal.lfilter(_b, _a, _data)
+    if zero_phase:
+        _y = signal.sosfiltfilt(_sos, _data)
+    else:
+        _y = signal.sosfilt(_sos, _data)
 
-    _y = _y + _shift
+    if shift:
+        _y += _shift
 
     return _y
 
 
 @export
 def pass_by_group(df: pd.DataFrame, col: str, groupby: Union[str, list], btype: str, shift: bool = False,
-                  cutoff: int = 1, fs: int = 20, order: int = 5):
+                  cutoff: int = 1, fs: int = 20, order: int = 5, zero_phase: bool = False):
     """
     allows applying a butter_pass filter by group
 
@@ -787,6 +873,7 @@ def pass_by_group(df: pd.DataFrame, col: str, groupby: Union[str, list], btype:
     :param cutoff: cutoff
     :param fs: critical frequencies
     :param order: order of the filter
+    :param zero_phase: whether to apply the filter forward and backward, see :func:`butter_pass_filter` [optional]
     :return: filtered DataFrame
     """
     df = assert_df(df)
@@ -795,7 +882,7 @@ def pass_by_group(df: pd.DataFrame, col: str, groupby: Union[str, list], btype:
 
     # apply highpass filter
     df[col] = np.concatenate(
-        _df_out_grouped[col].apply(butter_pass_filter, cutoff, fs, order, btype, shift).values).flatten()
+        _df_out_grouped[col].apply(butter_pass_filter, cutoff, fs, order, btype, shift, zero_phase).values).flatten()
 
     df = df.reset_index(drop=True)
 
@@ -820,6 +907,22 @@ def lfit(x: SequenceOrScalar, y: SequenceOrScalar = None, w: SequenceOrScalar =
     :param extrapolate: how many iteration to extrapolate [optional]
     :return: if return_df is True: pandas DataFrame, else: pandas Series
     """
+    # -- func
+    def _f_lfit(_f_x, _f_y, _f_w):
+        # closed form weighted least squares for deg=1, same weighting as numpy.polyfit (w applies to the residuals)
+        _w2 = np.ones(_f_x.shape[0]) if _f_w is None else _f_w ** 2
+        _w_sum = _w2.sum()
+        _x_mean = (_w2 * _f_x).sum() / _w_sum
+        _y_mean = (_w2 * _f_y).sum() / _w_sum
+        _x_centered = _f_x - _x_mean
+        _ss_xx = (_w2 * _x_centered ** 2).sum()
+        if not _ss_xx > 0:
+            # less than two distinct x values: numpy.polyfit warns (RankWarning) and returns the least squares
+            # solution of minimum norm, this case is rare enough to not need a closed form
+            return np.poly1d(np.polyfit(x=_f_x, y=_f_y, deg=1, w=_f_w))
+        _slope = (_w2 * _x_centered * (_f_y - _y_mean)).sum() / _ss_xx
+        return np.poly1d([_slope, _y_mean - _slope * _x_mean])
+
     if df is None:
         if hasattr(x, 'name'):
             _x_name = x.name
@@ -838,7 +941,8 @@ def lfit(x: SequenceOrScalar, y: SequenceOrScalar = None, w: SequenceOrScalar =
         _df[_y_name] = y
         _df[_w_name] = w
     else:
-        _df = df.copy()
+        # only the groupby dummy is added -> a shallow copy is sufficient
+        _df = df.copy(deep=False)
         del df
         _x_name = x
         _y_name = y
@@ -850,11 +954,13 @@ def lfit(x: SequenceOrScalar, y: SequenceOrScalar = None, w: SequenceOrScalar =
         _df[GROUPBY_DUMMY] = 1
     groupby = assert_list(groupby)
 
-    _it_max = _df[groupby].drop_duplicates().shape[0]
+    # the group count comes from the grouper metadata, no extra scan of the DataFrame
+    _df_grouped = _df.groupby(groupby)
+    _it_max = _df_grouped.ngroups
 
     _df_fit = []
 
-    for _it, (_index, _df_i) in enumerate(_df.groupby(groupby)):
+    for _it, (_index, _df_i) in enumerate(_df_grouped):
 
         if do_print and _it_max > 1:
             progressbar(_it, _it_max, print_prefix=qformat(_index))
@@ -877,20 +983,18 @@ def lfit(x: SequenceOrScalar, y: SequenceOrScalar = None, w: SequenceOrScalar =
         _idx = np.isfinite(_x) & np.isfinite(_y)
 
         if _w is not None:
-            _w_idx = _w[_idx]
+            _w_idx = _w[_idx].to_numpy()
         else:
             _w_idx = None
 
         if catch_error:
             try:
-                _fit = np.poly1d(np.polyfit(
-                    x=_x[_idx], y=_y[_idx], deg=1, w=_w_idx))
+                _fit = _f_lfit(_x[_idx].to_numpy(), _y[_idx].to_numpy(), _w_idx)
             except Exception as _exc:
                 warnings.warn('handled exception: {}'.format(_exc))
                 _fit = None
         else:
-            _fit = np.poly1d(np.polyfit(
-                x=_x[_idx], y=_y[_idx], deg=1, w=_w_idx))
+            _fit = _f_lfit(_x[_idx].to_numpy(), _y[_idx].to_numpy(), _w_idx)
 
         _x_diff = _x.diff().mean()
         _x = list(_x)
@@ -917,7 +1021,8 @@ def lfit(x: SequenceOrScalar, y: SequenceOrScalar = None, w: SequenceOrScalar =
 
         _df_fit.append(_df_fit_i)
 
-    _df_fit = concat(_df_fit)
+    # single concat of all group results, the per group frames are not used afterwards -> no need to copy
+    _df_fit = concat(_df_fit, copy=False)
 
     if do_print and _it_max > 1:
         progressbar()
@@ -998,7 +1103,8 @@ def qf(df: pd.DataFrame, fltr: Union[pd.DataFrame, pd.Series, Mapping], rem_unus
     :param reset_index: whether to reset index after filtering
     :return: filtered pandas DataFrame
     """
-    _df = df.copy()
+    # filtering returns a new DataFrame -> no need to copy
+    _df = df
     del df
 
     # filter_df can also be a dictionary, in which case pd.DataFrame.from_dict will be applied
@@ -1009,7 +1115,7 @@ def qf(df: pd.DataFrame, fltr: Union[pd.DataFrame, pd.Series, Mapping], rem_unus
         _filter_df = pd.DataFrame(fltr).T
     # assume it to be a DataFrame
     else:
-        _filter_df = fltr.copy()
+        _filter_df = fltr
         del fltr
 
     # drop columns not in
@@ -1049,60 +1155,39 @@ def quantile_split(s: pd.Series, n: int, signif: int = 2, na_to_med: bool = Fals
     :param n: number of quantiles to split into
     :param signif: number of significant digits to round to
     :param na_to_med: whether to fill na values with median values
-    :return: pandas Series of dtype category
+    :return: pandas Series of dtype category, missing and infinite values are labelled 'nan'
     """
-    if len(s.unique()) <= n:
+    if pd.Series(s).nunique(dropna=False) <= n:
         return s
 
-    _s = pd.Series(s).astype(float)
-    _s = np.where(~np.isfinite(_s), np.nan, _s)
-    _s = pd.Series(_s)
-
-    # noinspection PyTypeChecker
-    _s_out = _s.apply(lambda _: np.nan)
+    # one float copy of the data, non finite values are treated as missing
+    _values = pd.Series(s).to_numpy(dtype=float, copy=True)
+    _values[~np.isfinite(_values)] = np.nan
 
     if na_to_med:
-        _s = _s.fillna(_s.median())
+        _values = np.where(np.isnan(_values), np.nanmedian(_values), _values)
 
     if signif is not None:
-        _s = round_signif(_s, signif)
-
-    if not isinstance(_s, pd.Series):
-        _s = pd.Series(_s)
-
-    _i = -1
-
-    for _q in np.arange(0, 1, 1. / n):
+        _values = np.asarray(round_signif(_values, signif), dtype=float)
 
-        _i += 1
+    # get all quantile edges at once (one sort instead of one per quantile)
+    _edges = np.nanquantile(_values, np.linspace(0, 1, n + 1))
 
-        __q_min = np.quantile(_s.dropna().values, _q)
+    _labels = []
+    for _i in range(n):
+        _right_equal_sign = '<=' if _i == n - 1 else '<'
+        _labels.append('q{}: {}<=_{}{}'.format(_i, round_signif(_edges[_i], signif), _right_equal_sign,
+                                               round_signif(_edges[_i + 1], signif)))
 
-        if _q + .1 >= 1:
-            __q_max = _s.max()
-        else:
-            __q_max = np.quantile(_s.dropna().values, _q + .1)
-
-        if np.round(_q + .1, 1) == 1.:
-            __q_max_adj = np.inf
-            _right_equal_sign = '<='
-        else:
-            __q_max_adj = __q_max
-            _right_equal_sign = '<'
+    # bin i contains edges[i] <= value < edges[i + 1], the last bin has no upper limit
+    _codes = np.searchsorted(_edges[1:-1], _values, side='right') + 1
+    # missing values are labelled 'nan' (first category in sort order like the quantile labels)
+    _codes[np.isnan(_values)] = 0
 
-        _q_name = 'q{}: {}<=_{}{}'.format(_i, round_signif(__q_min, signif), _right_equal_sign,
-                                          round_signif(__q_max, signif))
-
-        _s_out = np.where((_s >= __q_min) & (
-            _s < __q_max_adj), _q_name, _s_out)
+    _s_out = pd.Categorical.from_codes(_codes, categories=['nan'] + _labels).remove_unused_categories()
 
     # get back the old properties of the series (or you'll screw the index)
-    _s_out = pd.Series(_s_out)
-    _s_out.name = s.name
-    _s_out.index = s.index
-
-    # convert to cat
-    _s_out = _s_out.astype('category')
+    _s_out = pd.Series(_s_out, index=s.index, name=s.name)
 
     return _s_out
 
@@ -1119,15 +1204,19 @@ def acc(y_true: Union[pd.Series, str], y_pred: Union[pd.Series, str], df: pd.Dat
     """
     if df is None:
 
-        _y_true = y_true
-        _y_pred = y_pred
+        _y_true = np.asarray(y_true)
+        _y_pred = np.asarray(y_pred)
 
     else:
 
-        _y_true = df[y_true]
-        _y_pred = df[y_pred]
+        _y_true = df[y_true].to_numpy()
+        _y_pred = df[y_pred].to_numpy()
 
-    _acc = np.sum(_y_true == _y_pred) / len(_y_true)
+    # no values: the accuracy is not defined
+    if _y_true.size == 0:
+        return np.nan
+
+    _acc = np.count_nonzero(_y_true == _y_pred) / _y_true.size
     return _acc
 
 
@@ -1144,34 +1233,35 @@ def rel_acc(y_true: Union[pd.Series, str], y_pred: Union[pd.Series, str], df: pd
     """
     if df is None:
 
-        _y_true = 'y_true'
-        _y_pred = 'y_pred'
-
-        _df = pd.DataFrame({
-            _y_true: y_true,
-            _y_pred: y_pred
-        })
+        _y_true = np.asarray(y_true)
+        _y_pred = np.asarray(y_pred)
 
     else:
 
-        _df = df.copy()
+        _y_true = df[y_true].to_numpy()
+        _y_pred = df[y_pred].to_numpy()
 
-        _y_true = y_true
-        _y_pred = y_pred
-
-        del df, y_true, y_pred
+    _n = _y_true.size
+    # no values: the accuracy is not defined
+    if _n == 0:
+        return np.nan
 
     if target_class is None:
         # get acc of pred
-        _acc = acc(_y_true, _y_pred, df=_df)
+        _acc = np.count_nonzero(_y_true == _y_pred) / _n
         # get percentage of most common value
-        _acc_mc = _df[_y_true].value_counts()[0] / _df.shape[0]
+        _codes, _ = pd.factorize(_y_true)
+        _acc_mc = np.bincount(_codes[_codes >= 0]).max() / _n
     else:
-        _df_target_class = _df.query('{}=="{}"'.format(_y_true, target_class))
+        _is_target_class = (_y_true == target_class)
+        _n_target_class = np.count_nonzero(_is_target_class)
+        # target class not in y_true: the accuracy for it is not defined
+        if _n_target_class == 0:
+            return np.nan
         # get acc of pred for target class
-        _acc = acc(_y_true, _y_pred, df=_df_target_class)
+        _acc = np.count_nonzero(_is_target_class & (_y_true == _y_pred)) / _n_target_class
         # get percentage of target class
-        _acc_mc = _df_target_class.shape[0] / _df.shape[0]
+        _acc_mc = _n_target_class / _n
 
     # rel acc is diff of both
     return _acc - _acc_mc
@@ -1188,28 +1278,21 @@ def cm(y_true: Union[pd.Series, str], y_pred: Union[pd.Series, str], df: pd.Data
     """
     if df is None:
 
-        _y_true = deepcopy(y_true)
-        _y_pred = deepcopy(y_pred)
+        _y_true = y_true
+        _y_pred = y_pred
 
-        if 'name' in dir(y_true):
-            y_true = y_true.name
-        else:
+        y_true = getattr(_y_true, 'name', None)
+        if y_true is None:
             y_true = 'y_true'
-        if 'name' in dir(y_pred):
-            y_pred = y_pred.name
-        else:
-            y_true = 'y_pred'
-        df = pd.DataFrame({
-            y_true: _y_true,
-            y_pred: _y_pred
-        })
+        y_pred = getattr(_y_pred, 'name', None)
+        if y_pred is None:
+            y_pred = 'y_pred'
     else:
         _y_true = df[y_true]
         _y_pred = df[y_pred]
 
-    _cm = df.eval('_count=1').groupby([y_true, y_pred]).agg({'_count': 'count'}).reset_index() \
-        .pivot_table(index=y_true, columns=y_pred, values='_count')
-    _cm = _cm.fillna(0).astype(int)
+    # count all combinations of true and predicted values in one pass
+    _cm = pd.crosstab(_y_true, _y_pred, rownames=[y_true], colnames=[y_pred])
 
     return _cm
 
@@ -1229,101 +1312,44 @@ def f1_pr(y_true: Union[pd.Series, str], y_pred: Union[pd.Series, str], df: pd.D
     """
     if df is None:
 
-        _y_true = deepcopy(y_true)
-        _y_pred = deepcopy(y_pred)
+        _y_true = y_true
+        _y_pred = y_pred
 
-        if 'name' in dir(y_true):
-            y_true = y_true.name
-        else:
+        y_true = getattr(_y_true, 'name', None)
+        if y_true is None:
             y_true = 'y_true'
-        if 'name' in dir(y_pred):
-            y_pred = y_pred.name
-        else:
-            y_true = 'y_pred'
-        df = pd.DataFrame({
-            y_true: _y_true,
-            y_pred: _y_pred
-        })
     else:
         _y_true = df[y_true]
         _y_pred = df[y_pred]
 
-    _cm = cm(y_true=y_true, y_pred=y_pred, df=df)
+    # cm gets the vectors directly (unnamed vectors must not collide on the same column)
+    _cm = cm(y_true=_y_true, y_pred=_y_pred)
 
     if target is None:
         target = _cm.index.tolist()
     elif not is_list_like(target):
         target = [target]
 
-    _f1_pr = []
-
-    _tp_sum = 0
-    _tn_sum = 0
-    _mp_sum = 0
-    _mn_sum = 0
-    _count_true_sum = 0
+    # square confusion matrix with the same levels on both axes (true as rows, predicted as columns)
+    _levels = _cm.index.union(_cm.columns, sort=False)
+    _cm_values = _cm.reindex(index=_levels, columns=_levels, fill_value=0).to_numpy()
 
-    for _target in target:
+    # true positive: out of predicted as target how many are actually target
+    _tp = np.diag(_cm_values)
+    # missed positive: out of true target how many were predicted as not target
+    _mp = _cm_values.sum(axis=1) - _tp
+    # missed negative: out of true not target how many were predicted as target
+    _mn = _cm_values.sum(axis=0) - _tp
 
-        if _target in _cm.index:
-            _count_true = _cm.loc[_target].sum()
-        else:
-            _count_true = 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        _precision = _tp / (_tp + _mn) * 100
+        _recall = _tp / (_tp + _mp) * 100
+        _f1 = 200 * (_precision / 100. * _recall / 100.) / (_precision / 100. + _recall / 100.)
 
-        _count_true_sum += _count_true
-
-        # true positive: out of predicted as target how many are actually target
-        try:
-            _tp_i = _cm[_target][_target]
-            _tp_sum += _tp_i
-        except ValueError:
-            _tp_i = np.nan
-        # false positive: out of predicted as not target how many are actually not target
-        try:
-            _tn_i = _cm.drop(_target, axis=1).drop(_target, axis=0).sum().sum()
-            _tn_sum += _tn_i
-        except ValueError:
-            _tn_i = np.nan
-
-        # missed positive: out of true target how many were predicted as not target
-        try:
-            _mp_i = _cm.drop(_target, axis=1).loc[_target].sum()
-            _mp_sum += _mp_i
-        except ValueError:
-            _mp_i = np.nan
-        # missed negative: out of true not target how many were predicted as target
-        try:
-            _mn_i = _cm.drop(_target, axis=0)[_target].sum()
-            _mn_sum += _mn_i
-        except ValueError:
-            _mn_i = np.nan
-
-        # precision
-        try:
-            _precision = _tp_i / (_tp_i + _mn_i) * 100
-        except ValueError:
-            _precision = np.nan
-
-        # recall
-        try:
-            _recall = _tp_i / (_tp_i + _mp_i) * 100
-        except ValueError:
-            _recall = np.nan
-
-        if np.isnan(_precision) or np.isnan(_recall):
-            _f1 = np.nan
-        else:
-            _f1 = 200 * (_precision / 100. * _recall / 100.) / \
-                (_precision / 100. + _recall / 100.)
-
-        # to df
-        _cm_target = pd.DataFrame({
-            y_true: [_target], 'count': [_count_true], 'F1': [_f1], 'precision': [_precision], 'recall': [_recall]
-        }).copy()
-
-        _f1_pr.append(_cm_target)
-
-    _f1_pr = pd.concat(_f1_pr, ignore_index=True, sort=False).set_index(y_true)
+    # to df
+    _f1_pr = pd.DataFrame({
+        y_true: _levels, 'count': _tp + _mp, 'F1': _f1, 'precision': _precision, 'recall': _recall
+    }).set_index(y_true).reindex(target)
 
     return _f1_pr
 
@@ -1357,7 +1383,8 @@ def f_score(y_true: Union[pd.Series, str], y_pred: Union[pd.Series, str], df: pd
         _y_true = assert_scalar(y_true)
         _y_pred = assert_scalar(y_pred)
 
-        _df = df.copy()
+        # _df is only filtered, never modified inplace -> no need to copy
+        _df = df
         del df
 
     if dropna:
@@ -1389,45 +1416,92 @@ def f_score(y_true: Union[pd.Series, str], y_pred: Union[pd.Series, str], df: pd
         return _df_out
 
 
+# -- score kernels used by the f_score wrappers, defined once on module level and working on plain arrays
+# (numpy equivalents of the sklearn.metrics functions without their per call input validation)
+def _f_r2(x, y):
+    _x = np.asarray(x, dtype=np.float64)
+    _y = np.asarray(y, dtype=np.float64)
+    if _x.shape[0] < 2:
+        return np.nan
+    _diff = _x - _y
+    _dev = _x - _x.mean()
+    _ss_res = np.dot(_diff, _diff)
+    _ss_tot = np.dot(_dev, _dev)
+    # same as sklearn.metrics.r2_score for constant y_true
+    if _ss_tot == 0:
+        return 1. if _ss_res == 0 else 0.
+    return 1 - _ss_res / _ss_tot
+
+
+def _f_mae(x, y):
+    return np.mean(np.abs(np.asarray(x, dtype=np.float64) - np.asarray(y, dtype=np.float64)))
+
+
+def _f_medae(x, y):
+    return np.median(np.abs(np.asarray(x, dtype=np.float64) - np.asarray(y, dtype=np.float64)))
+
+
+# keep the sklearn names, f_score uses them as column names when grouping
+_f_r2.__name__ = 'r2_score'
+_f_mae.__name__ = 'mean_absolute_error'
+_f_medae.__name__ = 'median_absolute_error'
+
+
+def _f_rmse(x, y):
+    _diff = np.asarray(x, dtype=np.float64) - np.asarray(y, dtype=np.float64)
+    return np.sqrt(np.mean(_diff * _diff))
+
+
+def _f_stdae(x, y):
+    return np.std(np.abs(np.asarray(x, dtype=np.float64) - np.asarray(y, dtype=np.float64)))
+
+
+def _f_corr(x, y):
+    # pairwise complete observations on plain arrays, pandas.Series.corr uses numpy.corrcoef as well
+    _x = np.asarray(x, dtype=np.float64)
+    _y = np.asarray(y, dtype=np.float64)
+    _mask = np.isfinite(_x) & np.isfinite(_y)
+    if _mask.sum() < 2:
+        return np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.corrcoef(_x[_mask], _y[_mask])[0, 1]
+
+
 # shorthand r2
 @export
 def r2(*args, **kwargs) -> Union[pd.DataFrame, float]:
     """
-    wrapper for f_score using sklearn.metrics.r2_score
+    wrapper for f_score using the coefficient of determination (same as sklearn.metrics.r2_score)
 
     :param args: passed to f_score
     :param kwargs: passed to f_score
     :return: if groupby is supplied: pandas DataFrame, else: scalar value
     """
-    return f_score(*args, f=r2_score, **kwargs)
+    return f_score(*args, f=_f_r2, **kwargs)
 
 
 @export
 def rmse(*args, **kwargs) -> Union[pd.DataFrame, float]:
     """
-    wrapper for f_score using numpy.sqrt(sklearn.metrics.mean_squared_error)
+    wrapper for f_score using the root mean squared error
 
     :param args: passed to f_score
     :param kwargs: passed to f_score
     :return: if groupby is supplied: pandas DataFrame, else: scalar value
     """
-
-    def _f_rmse(x, y):
-        return np.sqrt(mean_squared_error(x, y))
-
     return f_score(*args, f=_f_rmse, **kwargs)
 
 
 @export
 def mae(*args, **kwargs) -> Union[pd.DataFrame, float]:
     """
-    wrapper for f_score using sklearn.metrics.mean_absolute_error
+    wrapper for f_score using the mean absolute error (same as sklearn.metrics.mean_absolute_error)
 
     :param args: passed to f_score
     :param kwargs: passed to f_score
     :return: if groupby is supplied: pandas DataFrame, else: scalar value
     """
-    return f_score(*args, f=mean_absolute_error, **kwargs)
+    return f_score(*args, f=_f_mae, **kwargs)
 
 
 @export
@@ -1439,23 +1513,19 @@ def stdae(*args, **kwargs) -> Union[pd.DataFrame, float]:
     :param kwargs: passed to f_score
     :return: if groupby is supplied: pandas DataFrame, else: scalar value
     """
-
-    def _f_stdae(x, y):
-        return np.std(np.abs(x - y))
-
     return f_score(*args, f=_f_stdae, **kwargs)
 
 
 @export
 def medae(*args, **kwargs) -> Union[pd.DataFrame, float]:
     """
-    wrapper for f_score using sklearn.metrics.median_absolute_error
+    wrapper for f_score using the median absolute error (same as sklearn.metrics.median_absolute_error)
 
     :param args: passed to f_score
     :param kwargs: passed to f_score
     :return: if groupby is supplied: pandas DataFrame, else: scalar value
     """
-    return f_score(*args, f=median_absolute_error, **kwargs)
+    return f_score(*args, f=_f_medae, **kwargs)
 
 
 @export
@@ -1524,17 +1594,24 @@ def pae(*args, **kwargs):
 @export
 def corr(*args, **kwargs) -> Union[pd.DataFrame, float]:
     """
-    wrapper for f_score using pandas.Series.corr
+    wrapper for f_score using the pearson correlation (same as pandas.Series.corr)
 
     :param args: passed to f_score
     :param kwargs: passed to f_score
     :return: if groupby is supplied: pandas DataFrame, else: scalar value
     """
+    return f_score(*args, f=_f_corr, **kwargs)
 
-    def _f_corr(x, y):
-        return pd.Series(x).corr(other=pd.Series(y))
 
-    return f_score(*args, f=_f_corr, **kwargs)
+# maps score labels accepted by df_score to their scoring functions
+_score_funcs = {
+    'mae': mae,
+    'r2': r2,
+    'rmse': rmse,
+    'mpae': mpae,
+    'maep': maep,
+    'corr': corr
+}
 
 
 @export
@@ -1558,15 +1635,6 @@ def df_score(df: pd.DataFrame, y_true: SequenceOrScalar, y_pred: SequenceOrScala
     :param dropna: whether to drop na [optional]
     :return: pandas DataFrame containing al the scores
     """
-    # -- config
-    _score_dict = {
-        'mae': mae,
-        'r2': r2,
-        'rmse': rmse,
-        'mpae': mpae,
-        'maep': maep,
-        'corr': corr
-    }
     # -- assert
     if multi is None:
         multi = ['']
@@ -1580,19 +1648,15 @@ def df_score(df: pd.DataFrame, y_true: SequenceOrScalar, y_pred: SequenceOrScala
         scores = assert_list(scores)
         # str to function
         for _score in scores:
-            if isinstance(_score, str):
-                if _score in _score_dict.keys():
-                    _score = _score_dict[_score]
-                else:
-                    raise ValueError(
-                        f"Unknown score label: '{_score}', please pass a function instead")
-    df = assert_df(df)
+            if isinstance(_score, str) and _score not in _score_funcs.keys():
+                raise ValueError(f"Unknown score label: '{_score}', please pass a function instead")
+        scores = [_score_funcs[_score] if isinstance(_score, str) else _score for _score in scores]
+    df = assert_df(df, copy=False)
 
     if groupby:
         groupby = assert_list(groupby)
     else:
         groupby = [GROUPBY_DUMMY]
-        df[GROUPBY_DUMMY] = 1
 
     y_true = assert_list(y_true)
     pred_suffix = assert_list(pred_suffix)
@@ -1617,61 +1681,77 @@ def df_score(df: pd.DataFrame, y_true: SequenceOrScalar, y_pred: SequenceOrScala
                 'y_true is longer than y_pred, trailing entries will be dropped.')
 
     # -- init
+    # selecting the needed columns already creates a new DataFrame -> no need to copy the full df
+    df = df[[_col for _col in list_merge(groupby, y_true, y_pred) if _col in df.columns]]
+    if groupby == [GROUPBY_DUMMY]:
+        df[GROUPBY_DUMMY] = 1
     if dropna:
         df = df.dropna(subset=list_merge(y_true, y_pred))
     for _groupby in groupby:
         if df[_groupby].dtype.name == 'category':
             df[_groupby] = df[_groupby].cat.remove_unused_categories()
 
+    # collect one scale per column and apply them in a single assignment, each column is only scaled once
+    # even if it belongs to multiple y_true / y_pred pairs
+    _scales = {}
     if isinstance(scale, Mapping):
-        for _y_true, _scale in scale.items():
-            df[_y_true] *= _scale
-            _index = y_true.index(_y_true)
-            _y_pred = y_pred[_index]
-            df[_y_pred] *= _scale
+        for _y_true, _y_pred in zip(y_true, y_pred):
+            if _y_true in scale.keys():
+                _scales[_y_true] = _scales[_y_pred] = scale[_y_true]
     elif is_list_like(scale):
         for _scale, _y_true, _y_pred in zip(scale, y_true, y_pred):
-            df[_y_true] *= _scale
-            df[_y_pred] *= _scale
+            _scales[_y_true] = _scales[_y_pred] = _scale
     elif scale is not None:
-        for _y_true in y_true:
-            df[_y_true] *= scale
-        for _y_pred in y_pred:
-            df[_y_pred] *= scale
+        for _y_true, _y_pred in zip(y_true, y_pred):
+            _scales[_y_true] = _scales[_y_pred] = scale
+    if _scales:
+        _scale_cols = list(_scales.keys())
+        df[_scale_cols] = df[_scale_cols].to_numpy(dtype=np.float64) * np.array(list(_scales.values()),
+                                                                               dtype=np.float64)
 
     # -- main
-    _df_score = dict_list(
-        groupby + ['y_true', 'y_pred', 'y_ref', 'model', 'score', 'value'])
-
-    for _y_true, _y_pred in zip(y_true, y_pred):
-
+    # group only once, the sub DataFrames are reused for all y_true / y_pred / score combinations
+    # the pivot table is sorted anyway -> the groups only need to be sorted for the long format
+    # a single grouper is passed as scalar so the group keys are consistent across pandas versions
+    _groups = [(assert_list(_index), _df_i)
+               for _index, _df_i in df.groupby(groupby[0] if len(groupby) == 1 else groupby, sort=not pivot)]
+    _pairs = list(zip(y_true, y_pred))
+
+    for _y_true, _y_pred in _pairs:
         if _y_pred not in df.columns:
             raise KeyError(f"{_y_pred} not in columns")
 
-        for _score in scores:
-
-            for _index, _df_i in df.groupby(groupby):
-
-                _value = _score(_y_true, _y_pred, df=_df_i)
-
-                _append_dict = {
-                    'y_true': _y_true,
-                    'y_pred': _y_pred,
-                    'y_ref': _y_true,
-                    'model': _y_pred,
-                    'score': _score.__name__,
-                    'value': _value
-                }
+    # the rows are ordered by (y_true, y_pred) -> score -> group, only the values have to be filled in the loop
+    _n_groups = len(_groups)
+    _n_scores = len(scores)
+    _values = np.empty(len(_pairs) * _n_scores * _n_groups, dtype=np.float64)
 
-                for _groupby_i in groupby:
-                    _append_dict[_groupby_i] = _df_i[_groupby_i].iloc[0]
-
-                append_to_dict_list(_df_score, _append_dict)
+    _k = 0
+    for _y_true, _y_pred in _pairs:
+        for _score in scores:
+            for _index, _df_i in _groups:
+                _values[_k] = _score(_y_true, _y_pred, df=_df_i)
+                _k += 1
+
+    _y_true_values = np.repeat(np.array([_pair[0] for _pair in _pairs], dtype=object), _n_scores * _n_groups)
+    _y_pred_values = np.repeat(np.array([_pair[1] for _pair in _pairs], dtype=object), _n_scores * _n_groups)
+
+    _df_score = {}
+    for _it, _groupby_i in enumerate(groupby):
+        _df_score[_groupby_i] = np.tile(np.array([_index[_it] for _index, _ in _groups], dtype=object),
+                                        len(_pairs) * _n_scores)
+    # y_true / y_pred labels are cast to str before they are repeated to the row count
+    _df_score['y_true'] = np.repeat(np.array([str(_pair[0]) for _pair in _pairs], dtype=object),
+                                    _n_scores * _n_groups)
+    _df_score['y_pred'] = np.repeat(np.array([str(_pair[1]) for _pair in _pairs], dtype=object),
+                                    _n_scores * _n_groups)
+    _df_score['y_ref'] = _y_true_values
+    _df_score['model'] = _y_pred_values
+    _df_score['score'] = np.tile(np.repeat(np.array([str(_score.__name__) for _score in scores], dtype=object),
+                                           _n_groups), len(_pairs))
+    _df_score['value'] = _values
 
     _df_score = pd.DataFrame(_df_score)
-    _df_score[['y_true', 'y_pred', 'score']] = _df_score[[
-        'y_true', 'y_pred', 'score']].astype(str)
-    _df_score['value'] = _df_score['value'].astype(float)
 
     if _df_score.shape[0] == 0:
         raise ValueError("df_score is empty")
@@ -1716,14 +1796,33 @@ def rmsd(x: str, df: pd.DataFrame, group: str, return_df_paired: bool = False, a
 
     _agg_by_group = '{}_by_group'.format(agg_func)
 
-    _df = df.copy()
+    # only x is modified, the groups are used as is
+    _x = df[x]
 
     if to_abs:
-        _df[x] = _df[x].abs()
+        _x = _x.abs()
     if standardize:
-        _df[x] = (_df[x] - _df[x].mean()) / _df[x].std()
-
-    _df = _df.groupby([group]).agg({x: ['count', agg_func]}).reset_index()
+        _x = (_x - _x.mean()) / _x.std()
+
+    _grouped = _x.groupby(df[group], sort=False)
+    _count = _grouped.count()
+    _value = _grouped.agg(agg_func)
+
+    if not return_df_paired:
+        # sum over all pairs i != j of c_i * c_j * (v_i - v_j) ** 2 = 2 * (C * sum(c * v ** 2) - sum(c * v) ** 2)
+        # -> no need to build the O(G^2) paired DataFrame, v is centered for numerical stability
+        _count = _count.to_numpy(dtype=np.float64)
+        _value = _value.to_numpy(dtype=np.float64)
+        _mask = np.isfinite(_value)
+        _weight = _count.sum() ** 2 - (_count ** 2).sum()
+        _count = _count[_mask]
+        _value = _value[_mask]
+        if _count.sum() > 0:
+            _value = _value - (_count * _value).sum() / _count.sum()
+        _difference = 2. * (_count.sum() * (_count * _value ** 2).sum() - (_count * _value).sum() ** 2)
+        return np.sqrt(max(_difference, 0.) / _weight)
+
+    _df = pd.concat([_count, _value], axis=1).sort_index().reset_index()
     _df.columns = ['group', 'count', _agg_by_group]
     _df['dummy'] = 1
 
@@ -1735,10 +1834,7 @@ def rmsd(x: str, df: pd.DataFrame, group: str, return_df_paired: bool = False, a
     _df_paired['weighted_squared_difference'] = _df_paired['weight'] * \
         _df_paired['difference'] ** 2
 
-    if return_df_paired:
-        return _df_paired
-    else:
-        return np.sqrt(_df_paired['weighted_squared_difference'].sum() / _df_paired['weight'].sum())
+    return _df_paired
 
 
 # get a data frame showing the root mean squared difference by group type
@@ -1746,7 +1842,7 @@ def rmsd(x: str, df: pd.DataFrame, group: str, return_df_paired: bool = False, a
 @export
 def df_rmsd(x: str, df: pd.DataFrame, groups: Union[list, str] = None, hue: str = None, hue_order: list = None,
             sort_by_hue: bool = True, n_quantiles: int = 10, signif: int = 2, include_rmsd: bool = True,
-            **kwargs) -> pd.DataFrame:
+            n_jobs: int = None, **kwargs) -> pd.DataFrame:
     """
     calculate :func:`rmsd` for reference column x with multiple other columns and return as DataFrame. For a
     plot see :func:`~hhpy.plotting.rmsdplot`
@@ -1761,6 +1857,8 @@ def df_rmsd(x: str, df: pd.DataFrame, groups: Union[list, str] = None, hue: str
     :param signif: how many significant digits to use in quantile splitting [optional]
     :param include_rmsd: if False provide only a grouped DataFrame but don't actually calculate the rmsd,
         you can use include_rmsd=False to save computation time if you only need the maxperc (used in plotting)
+    :param n_jobs: if supplied the x / group combinations are calculated in parallel using joblib with this many
+        jobs, -1 uses all processors. By default they are calculated sequentially [optional]
     :param kwargs: passed to :func:`rmsd`
     :return: None
 
@@ -1768,10 +1866,9 @@ def df_rmsd(x: str, df: pd.DataFrame, groups: Union[list, str] = None, hue: str
 
     Check out the `example notebook <https://colab.research.google.com/drive/1wvkYK80if0okXJGf1j2Kl-SxXZdl-97k>`_
     """
-    # avoid inplace operations
-    _df = df.copy()
-
-    _df_rmsd = pd.DataFrame()
+    _df_rmsd = dict_list(['x', 'group', 'rmsd', 'maxperc', 'maxlevel', 'maxcount', 'count'])
+    if hue is not None:
+        _df_rmsd[hue] = []
 
     # x /  groups can be a list or a scaler
     if isinstance(x, list):
@@ -1780,68 +1877,94 @@ def df_rmsd(x: str, df: pd.DataFrame, groups: Union[list, str] = None, hue: str
         _x_list = [x]
 
     if groups is None:
-        groups = [_col for _col in _df.columns if _col not in _x_list]
+        groups = [_col for _col in df.columns if _col not in _x_list]
 
     if isinstance(groups, list):
         _groups = groups
     else:
         _groups = [groups]
 
+    # avoid inplace operations, selecting the needed columns already creates a new DataFrame
+    _df = df[list_merge(_x_list, _groups, hue)]
+
+    # numerical data is split in quantiles, the dtypes only need to be checked once
+    _numeric_cols = set(_df.select_dtypes(include=np.number).columns)
+
     if hue is not None:
-        if hue in list(_df.select_dtypes(include=np.number)):
+        if hue in _numeric_cols:
             _df[hue] = quantile_split(_df[hue], n=n_quantiles, signif=signif)
         _df[hue] = _df[hue].astype('category').cat.remove_unused_categories()
         _hues = _df[hue].cat.categories
+        # the hue masks do not depend on x or group
+        _hue_masks = {_hue: (_df[hue] == _hue).to_numpy() for _hue in _hues}
     else:
         _hues = [None]
+        _hue_masks = {}
 
-    # loop x
-    for _x in _x_list:
+    # -- func
+    def _f_rmsd_group(_df_i: pd.DataFrame, _x: str, _group: str) -> List[dict]:
+        # rows for one x / group combination (one per hue level), _df_i only holds x, hue and the split '_group'
 
-        # loop groups
-        for _group in _groups:
+        warnings.simplefilter(action='ignore', category=RuntimeWarning)
 
-            # eliminate self dependency
-            if _group == _x:
-                continue
+        _rows = []
 
-            # numerical data is split in quantiles
-            if _group in list(_df.select_dtypes(include=np.number)):
-                _df['_group'] = quantile_split(_df[_group], n_quantiles)
-            # other data is taken as is
+        # if hue is None, one calculation is enough
+        for _hue in _hues:
+
+            if hue is None:
+                _df_hue = _df_i
             else:
-                _df['_group'] = _df[_group].copy()
+                _df_hue = _df_i[_hue_masks[_hue]]
 
-            warnings.simplefilter(action='ignore', category=RuntimeWarning)
+            if include_rmsd:
+                _rmsd = rmsd(x=_x, df=_df_hue, group='_group', **kwargs)
+            else:
+                _rmsd = np.nan
 
-            # if hue is None, one calculation is enough
-            for _hue in _hues:
+            _value_counts = _df_hue['_group'].value_counts(sort=True)
+            _count = len(_df_hue)
+            _maxcount = _value_counts.iat[0]
+            _maxperc = _maxcount / _count
+            _maxlevel = _value_counts.index[0]
 
-                if hue is None:
-                    _df_hue = _df
-                else:
-                    _df_hue = _df[_df[hue] == _hue]
+            _append_dict = {'x': _x, 'group': _group, 'rmsd': _rmsd, 'maxperc': _maxperc,
+                            'maxlevel': _maxlevel, 'maxcount': _maxcount, 'count': _count}
+            if hue is not None:
+                _append_dict[hue] = _hue
 
-                if include_rmsd:
-                    _rmsd = rmsd(x=_x, df=_df_hue, group='_group', **kwargs)
-                else:
-                    _rmsd = np.nan
-
-                _count = len(_df_hue['_group'])
-                _maxcount = _df_hue['_group'].value_counts().reset_index()[
-                    '_group'].iloc[0]
-                _maxperc = _maxcount / _count
-                _maxlevel = _df_hue['_group'].value_counts().reset_index()[
-                    'index'].iloc[0]
-
-                _df_rmsd_hue = pd.DataFrame(
-                    {'x': _x, 'group': _group, 'rmsd': _rmsd, 'maxperc': _maxperc, 'maxlevel': _maxlevel,
-                     'maxcount': _maxcount, 'count': _count}, index=[0])
-                if hue is not None:
-                    _df_rmsd_hue[hue] = _hue
+            _rows.append(_append_dict)
+
+        return _rows
+
+    # -- main
+    # loop x / groups, eliminate self dependency
+    _tasks = [(_x, _group) for _x in _x_list for _group in _groups if _group != _x]
+
+    # each group is only split once, even if it is used for multiple x
+    _group_splits = {}
+    for _group in list_unique([_group for _, _group in _tasks]):
+        # numerical data is split in quantiles
+        if _group in _numeric_cols:
+            _group_splits[_group] = quantile_split(_df[_group], n_quantiles)
+        # other data is taken as is
+        else:
+            _group_splits[_group] = _df[_group]
 
-                _df_rmsd = _df_rmsd.append(
-                    _df_rmsd_hue, ignore_index=True, sort=False)
+    # each task only receives the columns it needs, the sub DataFrames are created lazily
+    _task_args = ((_df[list_merge(_x, hue)].assign(_group=_group_splits[_group]), _x, _group)
+                  for _x, _group in _tasks)
+
+    if n_jobs is None:
+        _results = [_f_rmsd_group(*_args) for _args in _task_args]
+    else:
+        _results = Parallel(n_jobs=n_jobs)(delayed(_f_rmsd_group)(*_args) for _args in _task_args)
+
+    for _rows in _results:
+        for _append_dict in _rows:
+            append_to_dict_list(_df_rmsd, _append_dict)
+
+    _df_rmsd = pd.DataFrame(_df_rmsd)
 
     # postprocessing, sorting etc.
     if hue is not None:
@@ -1888,7 +2011,30 @@ def df_p(x: str, group: str, df: pd.DataFrame, hue: str = None, agg_func: str =
     _df, _groupby, _groupby_names, _vars, _df_levels, _levels = df_group_hue(df, group=group, hue=hue, x=x,
                                                                              n_quantiles=n_quantiles)
 
-    _df_p = pd.DataFrame()
+    _df_p = dict_list()
+
+    # the values of each level are extracted once
+    _level_values = {_level: _df_i[x].dropna().to_numpy() for _level, _df_i in _df.groupby('_label', sort=False)}
+    _empty = np.array([], dtype=float)
+
+    # both tests are symmetric -> only calculate the upper triangle
+    _p_matrix = np.full((len(_levels), len(_levels)), np.nan)
+    for _i_1 in range(len(_levels)):
+        for _i_2 in range(_i_1 + 1, len(_levels)):
+
+            _s_1 = _level_values.get(_levels[_i_1], _empty)
+            _s_2 = _level_values.get(_levels[_i_2], _empty)
+
+            # get t test / median test
+            try:
+                if agg_func == 'median':
+                    _p = stats.median_test(_s_1, _s_2)[1]
+                else:  # if not median then mean
+                    _p = stats.ttest_ind(_s_1, _s_2, equal_var=False)[1]
+            except ValueError:
+                _p = np.nan
+
+            _p_matrix[_i_1, _i_2] = _p_matrix[_i_2, _i_1] = _p
 
     # Loop levels
     for _i_1 in range(len(_levels)):
@@ -1899,17 +2045,7 @@ def df_p(x: str, group: str, df: pd.DataFrame, hue: str = None, agg_func: str =
 
             if _level_1 != _level_2:
 
-                _s_1 = _df[_df['_label'] == _level_1][x].dropna()
-                _s_2 = _df[_df['_label'] == _level_2][x].dropna()
-
-                # get t test / median test
-                try:
-                    if agg_func == 'median':
-                        _p = stats.median_test(_s_1, _s_2)[1]
-                    else:  # if not median then mean
-                        _p = stats.ttest_ind(_s_1, _s_2, equal_var=False)[1]
-                except ValueError:
-                    _p = np.nan
+                _p = _p_matrix[_i_1, _i_2]
 
                 _df_dict = {}
 
@@ -1927,8 +2063,9 @@ def df_p(x: str, group: str, df: pd.DataFrame, hue: str = None, agg_func: str =
 
                 _df_dict['p'] = _p
 
-                _df_p = _df_p.append(pd.DataFrame(
-                    _df_dict, index=[0]), ignore_index=True, sort=False)
+                append_to_dict_list(_df_p, _df_dict)
+
+    _df_p = pd.DataFrame(_df_p)
 
     if agg:
         _df_p = _df_p.groupby(_groupby).agg({'p': 'mean'}).reset_index()
@@ -1974,7 +2111,6 @@ def df_agg(x, group, df, hue=None, agg=None, n_quantiles=10, na_to_med=False, p=
 
 # quick function to adjust group and hue to be categorical
 def df_group_hue(df, group, hue=None, x=None, n_quantiles=10, na_to_med=False, keep=True):
-    _df = df.copy()
     _hue = None
 
     if keep:
@@ -2000,7 +2136,8 @@ def df_group_hue(df, group, hue=None, x=None, n_quantiles=10, na_to_med=False, k
         if x not in _vars:
             _vars = [x] + _vars
 
-    _df = _df.drop([_col for _col in _df.columns if _col not in _vars], axis=1)
+    # selecting the needed columns already creates a new DataFrame -> no need to copy the full df
+    _df = df[[_col for _col in df.columns if _col in _vars]]
 
     _df[_group] = _df[group].copy()
     if hue is not None:
@@ -2012,15 +2149,19 @@ def df_group_hue(df, group, hue=None, x=None, n_quantiles=10, na_to_med=False, k
         _df[_hue] = _df[hue].copy()
 
     # - numeric to quantile
+    _numeric_cols = set(_df.select_dtypes(include=np.number).columns)
     # group
-    if _group in list(_df.select_dtypes(include=np.number)):
+    if _group in _numeric_cols:
         _df[_group] = quantile_split(
             _df[group], n_quantiles, na_to_med=na_to_med)
     _df[_group] = _df[_group].astype('category').cat.remove_unused_categories()
 
     # hue
     if hue is not None:
-        if _hue in list(_df.select_dtypes(include=np.number)):
+        if hue == group:
+            # same column -> reuse the split
+            _df[_hue] = _df[_group]
+        elif _hue in _numeric_cols:
             _df[_hue] = quantile_split(
                 _df[hue], n_quantiles, na_to_med=na_to_med)
         _df[_hue] = _df[_hue].astype('category').cat.remove_unused_categories()
@@ -2048,20 +2189,88 @@ def df_precision_filter(df, col, precision):
 # grouped iterpolate method (avoids .apply failing if one sub group fails)
 def grouped_interpolate(df, col, groupby, method=None):
 
-    _dfs_i = []
-
-    for _index_i, _df_i in df.groupby(groupby):
-
+    def _interpolate(_s):
         try:
-            _df_i[col] = _df_i[col].interpolate(method=method)
+            return _s.interpolate(method=method)
         except ValueError:  # do nothing
-            _df_i[col] = _df_i[col]
-
-        _dfs_i.append(_df_i)
-
-    _df_interpolate = pd.concat(_dfs_i)
-
-    return _df_interpolate[col]
+            return _s
+
+    # transform returns a Series aligned to df, no need to copy and concat the sub DataFrames
+    return df.groupby(groupby, sort=False)[col].transform(_interpolate)
+
+
+def _ols_stats(x: np.ndarray, y: np.ndarray) -> Tuple[float, float, float, float]:
+    # simple linear regression y = slope * x + intercept on the finite pairs of x and y,
+    # returns slope, intercept, r2 and rmse computed in one pass over the arrays
+    _mask = np.isfinite(x) & np.isfinite(y)
+    if not _mask.all():
+        x = x[_mask]
+        y = y[_mask]
+    if x.size == 0:
+        return np.nan, np.nan, np.nan, np.nan
+
+    _x_mean = x.mean()
+    _y_mean = y.mean()
+    _dx = x - _x_mean
+    _dy = y - _y_mean
+    _ss_xx = np.dot(_dx, _dx)
+    if not _ss_xx > 0:
+        return np.nan, np.nan, np.nan, np.nan
+
+    _slope = np.dot(_dx, _dy) / _ss_xx
+    _intercept = _y_mean - _slope * _x_mean
+
+    _ss_res = np.sum((_intercept + _slope * x - y) ** 2)
+    _ss_tot = np.dot(_dy, _dy)
+    # same convention as sklearn.metrics.r2_score for constant y
+    if _ss_tot > 0:
+        _r2 = 1. - _ss_res / _ss_tot
+    else:
+        _r2 = 1. if _ss_res == 0 else 0.
+    _rmse = np.sqrt(_ss_res / x.size)
+
+    return _slope, _intercept, _r2, _rmse
+
+
+def _rolling_ols(x: np.ndarray, y: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    # rolling slope and intercept of y = slope * x + intercept over the trailing window (min_periods=0),
+    # equivalent to rolling cov / var / mean but from one set of running sums instead of one pass each
+
+    def _window_sum(_a):
+        _a = np.cumsum(_a)
+        _a[window:] = _a[window:] - _a[:-window]
+        return _a
+
+    _x_valid = np.isfinite(x)
+    _y_valid = np.isfinite(y)
+    _xy_valid = _x_valid & _y_valid
+    # centering keeps the running sums small, the slope is shift invariant
+    _x_shift = x[_x_valid].mean() if _x_valid.any() else 0.
+    _y_shift = y[_y_valid].mean() if _y_valid.any() else 0.
+    _x = np.where(_x_valid, x - _x_shift, 0.)
+    _y = np.where(_y_valid, y - _y_shift, 0.)
+    _x_xy = np.where(_xy_valid, _x, 0.)
+    _y_xy = np.where(_xy_valid, _y, 0.)
+
+    _n_x = _window_sum(_x_valid.astype(np.float64))
+    _n_y = _window_sum(_y_valid.astype(np.float64))
+    _n_xy = _window_sum(_xy_valid.astype(np.float64))
+    _s_x = _window_sum(_x)
+    _s_y = _window_sum(_y)
+    _s_xx = _window_sum(_x * _x)
+    _s_x_xy = _window_sum(_x_xy)
+    _s_y_xy = _window_sum(_y_xy)
+    _s_xy = _window_sum(_x_xy * _y_xy)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        _cov = np.where(_n_xy > 1, (_s_xy - _s_x_xy * _s_y_xy / _n_xy) / (_n_xy - 1), np.nan)
+        _var = np.where(_n_x > 1, (_s_xx - _s_x * _s_x / _n_x) / (_n_x - 1), np.nan)
+        _slope = _cov / _var
+        _x_mean = _s_x / _n_x + _x_shift
+        _y_mean = _s_y / _n_y + _y_shift
+    _intercept = _y_mean - _slope * _x_mean
+
+    return _slope, _intercept
 
 
 def time_reg(df, t='t', y='y', t_unit='D', window=10, slope_diff_cutoff=.1, int_diff_cutoff=3, return_df_fit=False):
@@ -2097,10 +2306,8 @@ def time_reg(df, t='t', y='y', t_unit='D', window=10, slope_diff_cutoff=.1, int_
 
     _df['_y'] = (_df[y] - _df[y].mean()) / _df[y].std()
 
-    _df['slope_rolling'] = _df[_t_i].rolling(window, min_periods=0).cov(other=_df['_y'], pairwise=False) / _df[
-        _t_i].rolling(window, min_periods=0).var()
-    _df['int_rolling'] = _df['_y'].rolling(window, min_periods=0).mean() - _df['slope_rolling'] * _df[_t_i].rolling(
-        window, min_periods=0).mean()
+    _df['slope_rolling'], _df['int_rolling'] = _rolling_ols(_df[_t_i].to_numpy(dtype=np.float64),
+                                                            _df['_y'].to_numpy(dtype=np.float64), window)
 
     _df['slope_rolling_diff'] = np.abs(_df['slope_rolling'].diff())
     _df['int_rolling_diff'] = np.abs(_df['int_rolling'].diff())
@@ -2109,43 +2316,40 @@ def time_reg(df, t='t', y='y', t_unit='D', window=10, slope_diff_cutoff=.1, int_
     _df['int_change'] = _df['int_rolling_diff'] >= int_diff_cutoff
     _df['_change'] = (_df['slope_change']) | (_df['int_change'])
 
-    _df_phases = _df[_df['_change']][[t, _t_i]]
+    # append row for last phase, it starts where the last change happened
+    _df_phases = pd.concat([
+        _df[_df['_change']][[t, _t_i]],
+        pd.DataFrame({t: _t_max, _t_i: _t_i_max}, index=[0])
+    ], ignore_index=True, sort=False)
 
     _df_phases.insert(0, _t_from, _df_phases[t].shift(1).fillna(_t_min))
     _df_phases.insert(2, _t_i_from, _df_phases[_t_i].shift(1).fillna(_t_i_min))
 
     _df_phases = _df_phases.rename({t: _t_to, _t_i: _t_i_to}, axis=1)
 
-    # append row for last phase
-    _df_phases = _df_phases.append(
-        pd.DataFrame({
-            _t_from: _df_phases[_t_from].max(),
-            _t_to: _t_max,
-            _t_i_from: _df_phases[_t_i_from].max(),
-            _t_i_to: _t_i_max,
-        }, index=[0]), ignore_index=True, sort=False
-    )
-
-    _df_phases[_y_slope] = np.nan
-    _df_phases[_y_int] = np.nan
-    _df_phases[_y_r2] = np.nan
-    _df_phases[_y_rmse] = np.nan
-    _df_phases['_keep'] = False
-
     _dfs = []
 
     _continue = False
     _t_i_from_row = None
 
-    for _i, _row in _df_phases.iterrows():
+    # plain arrays instead of boxing each phase row as a Series
+    _t_i_values = _df[_t_i].to_numpy()
+    _t_i_from_values = _df_phases[_t_i_from].to_numpy(copy=True)
+    _t_i_to_values = _df_phases[_t_i_to].to_numpy()
+
+    # output buffers, assigned to _df_phases after the loop
+    _keep = np.zeros(_df_phases.shape[0], dtype=bool)
+    _stats = np.full((_df_phases.shape[0], 4), np.nan)
+
+    for _i in range(_df_phases.shape[0]):
 
         # check len of the phase: if len is less than window days it will be merged with next phase
-        _t_i_to_row = _row[_t_i_to]
+        _t_i_to_row = _t_i_to_values[_i]
 
         if not _continue:
-            _t_i_from_row = _row[_t_i_from]
+            _t_i_from_row = _t_i_from_values[_i]
 
-        _df_t = _df[(_df[_t_i] >= _t_i_from_row) & (_df[_t_i] < _t_i_to_row)]
+        _df_t = _df[(_t_i_values >= _t_i_from_row) & (_t_i_values < _t_i_to_row)]
 
         _len_df_t = _df_t.index.max() - _df_t.index.min() + 1
 
@@ -2154,30 +2358,27 @@ def time_reg(df, t='t', y='y', t_unit='D', window=10, slope_diff_cutoff=.1, int_
             continue
         else:
             _continue = False
-            _df_phases['_keep'][_i] = True
-            _df_phases[_t_i_from][_i] = _t_i_from_row
+            _keep[_i] = True
+            _t_i_from_values[_i] = _t_i_from_row
 
-        # calculate slope
-        _y_slope_i = _df_t[_t_i].cov(other=_df_t[y]) / _df_t[_t_i].var()
-        # calculate intercept
-        _y_int_i = _df_t[y].mean() - _y_slope_i * _df_t[_t_i].mean()
+        # calculate slope, intercept and scores
+        _y_slope_i, _y_int_i, _y_r2_i, _y_rmse_i = _ols_stats(_df_t[_t_i].to_numpy(dtype=np.float64),
+                                                              _df_t[y].to_numpy(dtype=np.float64))
 
         # calculate y fit
         _df_t[_y_fit] = _y_int_i + _df_t[_t_i] * _y_slope_i
 
-        _df_phases[_y_slope][_i] = _y_slope_i
-        _df_phases[_y_int][_i] = _y_int_i
-        _df_phases[_y_r2][_i] = r2_score(_df_t[y], _df_t[_y_fit])
-        _df_phases[_y_rmse][_i] = np.sqrt(
-            mean_squared_error(_df_t[y], _df_t[_y_fit]))
+        _stats[_i] = _y_slope_i, _y_int_i, _y_r2_i, _y_rmse_i
 
         _dfs.append(_df_t)
 
     _df_fit = pd.concat(_dfs)
 
     # postprocessing
-    _df_phases = _df_phases[_df_phases['_keep']].reset_index(
-        drop=True).drop(['_keep'], axis=1)
+    _df_phases[_t_i_from] = _t_i_from_values
+    for _it, _col in enumerate([_y_slope, _y_int, _y_r2, _y_rmse]):
+        _df_phases[_col] = _stats[:, _it]
+    _df_phases = _df_phases[_keep].reset_index(drop=True)
 
     if return_df_fit:
         return _df_fit
@@ -2211,8 +2412,6 @@ def lr(df, x, y, groupby=None, t_unit='D', do_print=True):
     _x_i = '_x_i'
     _y_slope = '{}_slope'.format(y)
     _y_int = '{}_int'.format(y)
-    _y_fit = '{}_fit'.format(y)
-    _y_error = '{}_error'.format(y)
 
     # -- init
     if do_print:
@@ -2227,8 +2426,7 @@ def lr(df, x, y, groupby=None, t_unit='D', do_print=True):
         _df['_dummy'] = 1
         groupby = ['_dummy']
 
-    _df_out = dict_list(
-        groupby + [_y_slope, _y_int, 'r2', 'rmse', 'error_mean', 'error_std', 'error_abs_mean', 'error_abs_std'])
+    _stats = [_y_slope, _y_int, 'r2', 'rmse', 'error_mean', 'error_std', 'error_abs_mean', 'error_abs_std']
 
     if isinstance(_df[x].iloc[0], pd.datetime):
         _df[_x_i] = (_df[x] - _df[x].min()) / np.timedelta64(1, t_unit)
@@ -2237,37 +2435,38 @@ def lr(df, x, y, groupby=None, t_unit='D', do_print=True):
 
     # loop groups
 
-    _i = 0
-    _i_max = _df[groupby].drop_duplicates().shape[0]
+    _df_grouped = _df.groupby(groupby)
+    _i_max = _df_grouped.ngroups
 
-    for _index, _df_i in _df.groupby(groupby):
+    # one row per group, preallocated
+    _keys = np.empty((_i_max, len(groupby)), dtype=object)
+    _values = np.full((_i_max, len(_stats)), np.nan)
 
-        _i += 1
+    for _i, (_index, _df_i) in enumerate(_df_grouped):
 
         if do_print:
-            tprint('Linear Regression Iteration {} / {}'.format(_i, _i_max))
-
-        _slope = _df_i[_x_i].cov(other=_df_i[y]) / _df_i[_x_i].var()
-        _int = _df_i[y].mean() - _slope * _df_i[_x_i].mean()
-        _df_i[_y_fit] = _slope * _df_i[x] + _int
-        _df_i[_y_error] = _df_i[_y_fit] - _df_i[y]
-
-        _r2 = r2(_df_i[y], _df_i[_y_fit])
-        _rmse = rmse(_df_i[y], _df_i[_y_fit])
-
-        append_to_dict_list(_df_out, _index)
-        append_to_dict_list(_df_out, {
-            _y_slope: _slope,
-            _y_int: _int,
-            'r2': _r2,
-            'rmse': _rmse,
-            'error_mean': _df_i[_y_error].mean(),
-            'error_std': _df_i[_y_error].std(),
-            'error_abs_mean': _df_i[_y_error].abs().mean(),
-            'error_abs_std': _df_i[_y_error].abs().std()
-        })
+            tprint('Linear Regression Iteration {} / {}'.format(_i + 1, _i_max))
+
+        _x_values = _df_i[_x_i].to_numpy(dtype=np.float64)
+        _y_values = _df_i[y].to_numpy(dtype=np.float64)
+
+        _slope, _int, _r2, _rmse = _ols_stats(_x_values, _y_values)
+        _error = _slope * _x_values + _int - _y_values
+        _error_abs = np.abs(_error)
 
-    _df_out = pd.DataFrame(_df_out)
+        _keys[_i] = assert_list(_index)
+        _values[_i, :4] = _slope, _int, _r2, _rmse
+        if _error.size > 0:
+            _values[_i, 4] = _error.mean()
+            _values[_i, 6] = _error_abs.mean()
+        if _error.size > 1:
+            _values[_i, 5] = _error.std(ddof=1)
+            _values[_i, 7] = _error_abs.std(ddof=1)
+
+    _df_out = pd.concat([
+        pd.DataFrame(_keys, columns=groupby).infer_objects(),
+        pd.DataFrame(_values, columns=_stats)
+    ], axis=1)
 
     if '_dummy' in _df_out.columns:
         _df_out = _df_out.drop(['_dummy'], axis=1)
@@ -2316,13 +2515,16 @@ def df_split(df: pd.DataFrame, split_by: Union[List[str], str], return_type: str
     else:
         _dfs = {}
 
-    for _i, _df in df.groupby(_split_by):
+    # positional indices per group, each sub-DataFrame is then a single take
+    for _index, _indices in df.groupby(_split_by).indices.items():
+
+        _df = df.take(_indices)
 
         if return_type == 'list':
             _dfs.append(_df)
         else:
-            _key = qformat(pd.DataFrame(_df[_split_by]).head(
-                1), print_key=print_key, sep=sep, key_sep=key_sep)
+            _key = qformat(dict(zip(_split_by, assert_list(_index))), print_key=print_key, sep=sep,
+                           key_sep=key_sep)
             _dfs[_key] = _df
 
     return _dfs
@@ -2356,7 +2558,8 @@ def rank(df: pd.DataFrame, rankby: SequenceOrScalar, groupby: SequenceOrScalar =
     """
 
     # -- assert
-    df, groupby = assert_df(df=df, groupby=groupby)
+    # only new columns are added -> a shallow copy is enough
+    df, groupby = assert_df(df=df, groupby=groupby, copy=False)
     rankby = assert_list(rankby)
     sortby = assert_list(sortby)
 
@@ -2444,36 +2647,44 @@ def kde(x, df=None, x_range=None, perc_cutoff=.1, range_cutoff=None, x_steps=100
     # we get the extrema and do a full merge to find the closest one to each point
     _df_kde_ex = _df_kde.query(
         'ex_max')[[_x_name, 'value', 'phase']].reset_index()
-    _df_kde_ex['mean'] = np.nan
-    _df_kde_ex['std'] = np.nan
-    _df_kde_ex['range'] = np.nan
-    _df_kde_ex['range_min'] = np.nan
-    _df_kde_ex['range_max'] = np.nan
-    _df_kde_ex['value_min'] = np.nan
-    _df_kde_ex['value_max'] = np.nan
+    _ex_stats = ['mean', 'std', 'range', 'range_min', 'range_max', 'value_min', 'value_max']
+    _ex_values = np.full((_df_kde_ex.shape[0], len(_ex_stats)), np.nan)
+
+    # plain arrays instead of boxing each extremum row as a Series
+    _x_values = _x.to_numpy()
+    _kde_x = _df_kde[_x_name].to_numpy()
+    _kde_value = _df_kde['value'].to_numpy()
+    _kde_phase = _df_kde['phase'].to_numpy()
+    _ex_value = _df_kde_ex['value'].to_numpy()
+    _ex_phase = _df_kde_ex['phase'].to_numpy()
+    _ex_index = _df_kde_ex['index'].to_numpy()
+
+    # the phases are consecutive blocks starting at a minimum -> within a phase the kde is ascending up to the
+    # peak and descending after it, so both ends of the peak range can be found via binary search
+    _phase_starts = np.searchsorted(_kde_phase, _ex_phase, side='left')
+    _phase_ends = np.searchsorted(_kde_phase, _ex_phase, side='right')
 
-    for _index, _row in _df_kde_ex.iterrows():
-        _df_kde_i = _df_kde[_df_kde['phase'] == _row['phase']]
+    for _i in range(_df_kde_ex.shape[0]):
 
         # Width of Peak range
-        _df_kde_i = _df_kde_i[_df_kde_i['value']
-                              >= _row['value'] * _range_cutoff]
+        _cutoff = _ex_value[_i] * _range_cutoff
+        _peak = _ex_index[_i]
+        _index_min = _phase_starts[_i] + np.searchsorted(_kde_value[_phase_starts[_i]:_peak + 1], _cutoff,
+                                                          side='left')
+        _index_max = _peak + np.searchsorted(-_kde_value[_peak:_phase_ends[_i]], -_cutoff, side='right') - 1
 
-        _x_min = _df_kde_i[_x_name].iloc[0]
-        _x_max = _df_kde_i[_x_name].iloc[-1]
+        _x_min = _kde_x[_index_min]
+        _x_max = _kde_x[_index_max]
 
-        _x_i = np.extract((_x > _x_min) & (_x < _x_max), _x)
+        _x_i = np.extract((_x_values > _x_min) & (_x_values < _x_max), _x_values)
 
         _mean, _std = stats.norm.fit(_x_i)
 
-        _df_kde_ex['mean'].loc[_index] = _mean
-        _df_kde_ex['std'].loc[_index] = _std
+        _ex_values[_i] = [_mean, _std, _x_max - _x_min, _x_min, _x_max, _kde_value[_index_min],
+                          _kde_value[_index_max]]
 
-        _df_kde_ex['range'].loc[_index] = _x_max - _x_min
-        _df_kde_ex['range_min'].loc[_index] = _x_min
-        _df_kde_ex['range_max'].loc[_index] = _x_max
-        _df_kde_ex['value_min'].loc[_index] = _df_kde_i['value'].iloc[0]
-        _df_kde_ex['value_max'].loc[_index] = _df_kde_i['value'].iloc[-1]
+    for _it, _ex_stat in enumerate(_ex_stats):
+        _df_kde_ex[_ex_stat] = _ex_values[:, _it]
 
     return _df_kde, _df_kde_ex
 
@@ -2485,19 +2696,46 @@ def qagg(df: pd.DataFrame, groupby, columns=None, agg=None, reset_index=True):
     if columns is None:
         columns = df.select_dtypes(include=np.number).columns
 
-    _df_agg = df.groupby(groupby).agg({_: agg for _ in columns})
-    _df_agg = _df_agg.set_axis(
-        flatten([[_ + '_mean', _ + '_std'] for _ in columns]), axis=1, inplace=False)
+    # all statistics are calculated in one grouped pass, the columns are named {column}_{agg}
+    _df_agg = df.groupby(groupby)[list(columns)].agg(assert_list(agg))
+    _df_agg.columns = [f"{_column}_{_agg}" for _column, _agg in _df_agg.columns]
     if reset_index:
         _df_agg = _df_agg.reset_index()
     return _df_agg
 
 
+# reference statistics of mahalanobis by (content digest, shape, params) of the reference DataFrame
+_mahalanobis_cache = {}
+_MAHALANOBIS_CACHE_SIZE = 16
+
+
+def _mahalanobis_fit(df: pd.DataFrame) -> Optional[Tuple[np.ndarray, tuple]]:
+    # mean and cholesky factor of the covariance matrix of df, None if the covariance is not positive definite
+    _values = np.asfortranarray(df.to_numpy(dtype=np.float64))
+    if np.isnan(_values).any():
+        # pairwise complete covariance
+        _cov = np.asfortranarray(df.cov().to_numpy(dtype=np.float64))
+        _y = df.mean().to_numpy(dtype=np.float64)
+    else:
+        _y = _values.mean(axis=0)
+        _centered = _values - _y
+        _cov = _centered.T @ _centered / (_values.shape[0] - 1)
+
+    # solve with the cholesky factor of the covariance matrix instead of inverting it
+    try:
+        _cho = cho_factor(_cov, lower=True, overwrite_a=True)
+    except (np.linalg.LinAlgError, ValueError):
+        return None
+
+    return _y, _cho
+
+
 @export
 def mahalanobis(point: Union[pd.DataFrame, pd.Series, np.ndarray], df: pd.DataFrame = None, params: List[str] = None,
                 do_print: bool = True) -> Union[float, List[float]]:
     """
-    Calculates the Mahalanobis distance for a single point or a DataFrame of points
+    Calculates the Mahalanobis distance for a single point or a DataFrame of points. The mean and covariance of the
+    reference DataFrame are cached by the content of its params columns
 
     :param point: The point(s) to calculate the Mahalanobis distance for
     :param df: The reference DataFrame against which to calculate the Mahalanobis distance
@@ -2508,69 +2746,74 @@ def mahalanobis(point: Union[pd.DataFrame, pd.Series, np.ndarray], df: pd.DataFr
     if df is None:
         df = point
 
-    _df = df.copy()
-    del df
-
     if params is None:
-        params = _df.columns
+        params = df.columns
+
+    # -- fit (cached)
+    _df = df[params]
+    # hashing is linear in the size of df while the fit is quadratic in the number of params, keying on the content
+    # means inplace changes of df are never served from the cache
+    _digest = hashlib.sha1(pd.util.hash_pandas_object(_df, index=False).to_numpy().tobytes()).hexdigest()
+    _key = (_digest, _df.shape, tuple(params))
+    if _key in _mahalanobis_cache:
+        _fit = _mahalanobis_cache[_key]
     else:
-        _df = _df[params]
+        _fit = _mahalanobis_fit(_df)
+        if len(_mahalanobis_cache) >= _MAHALANOBIS_CACHE_SIZE:
+            del _mahalanobis_cache[next(iter(_mahalanobis_cache))]
+        _mahalanobis_cache[_key] = _fit
 
-    try:
-        _vi = np.linalg.inv(_df.cov())
-    except np.linalg.LinAlgError:
+    if _fit is None:
         return np.nan
+    _y, _cho = _fit
 
-    _y = _df.mean().values
-
+    # -- main
     if isinstance(point, pd.DataFrame):
 
-        _out = []
-
-        _it = -1
-        for _index, _row in point.iterrows():
-
-            _it += 1
-
-            if do_print:
-                progressbar(_it, point.shape[0])
-
-            _x = _row[params].values
-            _out.append(distance.mahalanobis(_x, _y, _vi))
+        # all points at once: sqrt((x - y) @ vi @ (x - y).T) for each row
+        _diff = point[params].to_numpy(dtype=np.float64, copy=True)
+        _diff -= _y
+        # one preallocated output array, clipping and sqrt are done inplace
+        _out = np.empty(_diff.shape[0], dtype=np.float64)
+        np.einsum('ij,ji->i', _diff, cho_solve(_cho, _diff.T), out=_out)
+        np.maximum(_out, 0., out=_out)
+        np.sqrt(_out, out=_out)
 
         if do_print:
             progressbar()
-        return _out
+        return _out.tolist()
 
     elif isinstance(point, pd.Series):
-        _x = point[params].values
+        _x = point[params].to_numpy(dtype=np.float64)
     else:
-        _x = np.array(point)
+        _x = np.asarray(point, dtype=np.float64)
+
+    # same quadratic form as above, no need to go through scipy.spatial.distance for a single point
+    _diff = _x - _y
+    return np.sqrt(np.maximum(_diff @ cho_solve(_cho, _diff), 0.))
 
-    return distance.mahalanobis(_x, _y, _vi)
 
 
 def multi_melt(df, cols, suffixes, id_vars, var_name='variable', sep='_', **kwargs):
     # for multi melt to work the columns must share common suffixes
 
-    _df = df.copy()
+    # melt always returns a new DataFrame -> no need to copy
+    _df = df
     del df
 
-    _df_out = []
-
-    for _col in cols:
-        _value_vars = ['{}{}{}'.format(_col, sep, _suffix)
-                       for _suffix in suffixes]
+    _cols = assert_list(cols)
+    _suffixes = [str(_suffix) for _suffix in suffixes]
 
-        _df_out_i = _df.melt(id_vars=id_vars, value_vars=_value_vars,
-                             value_name=_col, var_name=var_name, **kwargs)
-        _df_out_i[var_name] = _df_out_i[var_name].str.slice(
-            len(_col) + len(sep))
-        _df_out_i = _df_out_i.sort_values(by=assert_list(
-            id_vars) + [var_name]).reset_index(drop=True)
-        _df_out.append(_df_out_i)
+    # melt the first col only: this provides the id vars in melt order (suffix major) ...
+    _df_out = _df.melt(id_vars=id_vars, value_vars=[f"{_cols[0]}{sep}{_suffix}" for _suffix in _suffixes],
+                       value_name=_cols[0], var_name=var_name, **kwargs)
+    _df_out[var_name] = np.repeat(_suffixes, _df.shape[0]).astype(object)
+    # ... the other cols are stacked in the same order directly from the values
+    for _col in _cols[1:]:
+        _df_out[_col] = _df[[f"{_col}{sep}{_suffix}" for _suffix in _suffixes]].to_numpy().ravel('F')
 
-    _df_out = pd.concat(_df_out, axis=1).pipe(drop_duplicate_cols)
+    # sort once for all cols
+    _df_out = _df_out.sort_values(by=assert_list(id_vars) + [var_name], ignore_index=True)
 
     return _df_out
 
@@ -2579,7 +2822,8 @@ def multi_melt(df, cols, suffixes, id_vars, var_name='variable', sep='_', **kwar
 def resample(df, rule=1, on=None, groupby=None, agg='mean', columns=None, adj_column_names=True, factor=1, **kwargs):
     assert isinstance(df, pd.DataFrame), 'df must be a DataFrame'
 
-    _df = df.copy()
+    # only the index is replaced -> a shallow copy is enough
+    _df = df.copy(deep=False)
     del df
 
     if on is not None:
@@ -2588,38 +2832,51 @@ def resample(df, rule=1, on=None, groupby=None, agg='mean', columns=None, adj_co
         _columns = _df.select_dtypes(include=np.number).columns
     else:
         _columns = columns
-    if groupby is not None:
-        _columns = [_ for _ in _columns if _ not in assert_list(groupby)]
-        _df = _df.groupby(groupby)
-
-    # convert int to seconds to be able to use .resample
-    _df.index = pd.to_datetime(_df.index * factor, unit='s')
-
-    # resample as time series
-    _df = _df.resample('{}s'.format(rule), **kwargs)
-
-    # agg
-    _adj_column_names = False
-    if agg == 'mean':
-        _df = _df.mean()
-    elif agg == 'median':
-        _df = _df.median()
-    elif agg == 'sum':
-        _df = _df.sum()
+    _groupby = assert_list(groupby)
+    _columns = [_ for _ in _columns if _ not in _groupby]
+
+    _index_name = _df.index.name
+
+    if kwargs:
+        # DataFrame.resample kwargs (closed, label, origin, ...): resample the index as seconds like a time series
+        _df.index = pd.to_datetime(_df.index.to_numpy(dtype=np.float64) * factor, unit='s')
+        if _groupby:
+            _df = _df.groupby(_groupby)[_columns]
+        else:
+            _df = _df[_columns]
+        _df = _df.resample('{}s'.format(rule), **kwargs).agg(agg)
+
+        # back to the index unit
+        _index_seconds = _df.index.get_level_values(-1)
+        _index_seconds = (_index_seconds - pd.Timestamp(0)).total_seconds().to_numpy() / factor
+        if _groupby:
+            _df.index = pd.MultiIndex.from_arrays(
+                [_df.index.get_level_values(_) for _ in range(_df.index.nlevels - 1)] + [_index_seconds],
+                names=_df.index.names[:-1] + [_index_name])
+        else:
+            _df.index = pd.Index(_index_seconds, name=_index_name)
+
     else:
-        _df = _df.agg({_: agg for _ in _columns})
-        if adj_column_names:
-            _adj_column_names = True
-
-    # back to int
-    _df.index = ((_df.index - pd.to_datetime('1970-01-01')
-                  ).total_seconds() / factor)
-    if _adj_column_names:
-        _column_names = []
-        for _col in _columns:
-            for _agg in assert_list(agg):
-                _column_names += ['{}_{}'.format(_col, _agg)]
-        _df.columns = _column_names
+        # bin the integer index directly (instead of resampling it as seconds), bins are numbered from 0
+        _bins = pd.Series(np.floor(_df.index.to_numpy(dtype=np.float64) * factor / rule), index=_df.index,
+                          name=_index_name)
+        _df = _df.groupby([_df[_] for _ in _groupby] + [_bins])[_columns]
+
+        # agg (pandas dispatches string aggs to the cython implementations)
+        _df = _df.agg(agg)
+
+        # like a time series resample: empty bins between the first and the last bin are included
+        if not _groupby and _df.shape[0] > 0:
+            _fill_value = 0 if isinstance(agg, str) and agg in ['sum', 'count', 'size', 'nunique'] else np.nan
+            _df = _df.reindex(np.arange(_df.index[0], _df.index[-1] + 1), fill_value=_fill_value)
+
+        # back to the index unit
+        if _groupby:
+            _df.index = _df.index.set_levels(_df.index.levels[-1] * rule / factor, level=-1)
+        else:
+            _df.index = pd.Index(_df.index * rule / factor, name=_index_name)
+    if adj_column_names and agg not in ['mean', 'median', 'sum']:
+        _df.columns = ['{}_{}'.format(_col, _agg) for _col in _columns for _agg in assert_list(agg)]
 
     return _df
 
@@ -2649,8 +2906,8 @@ def df_count(x: str, df: pd.DataFrame, hue: Optional[str] = None, sort_by_count:
     :return: pandas DataFrame containing the counts by x (and by hue if it is supplied)
     """
     # -- init
-    # avoid inplace operations
-    df = assert_df(df)
+    # avoid inplace operations, selecting the needed columns already creates a new DataFrame
+    df = assert_df(df, copy=False)[list_merge(x, hue)]
 
     # if applicable: drop NaN
     if (not na) or (na == 'drop'):
@@ -2682,16 +2939,14 @@ def df_count(x: str, df: pd.DataFrame, hue: Optional[str] = None, sort_by_count:
             x_min = df[x].min()
         if x_max is None:
             x_max = df[x].max()
-        _df_xs = pd.DataFrame({x: range(x_min, x_max, x_base)})
-        _xs_on = [x]
-
-        # init hues
-        if hue is not None:
-            _df_hues = df[[hue]].drop_duplicates(
-            ).reset_index().assign(_dummy=1)
-            _df_xs = pd.merge(_df_xs.assign(_dummy=1), _df_hues,
-                              on='_dummy').drop(['_dummy'], axis=1)
-            _xs_on = _xs_on + [hue]
+        _xs = range(x_min, x_max, x_base)
+        if hue is None:
+            _df_xs = pd.DataFrame({x: _xs})
+            _xs_on = [x]
+        else:
+            # all combinations of xs and hues
+            _df_xs = pd.MultiIndex.from_product([_xs, df[hue].unique()], names=[x, hue]).to_frame(index=False)
+            _xs_on = [x, hue]
 
     else:
         # apply x limits (ignored if not numeric)
@@ -2701,10 +2956,11 @@ def df_count(x: str, df: pd.DataFrame, hue: Optional[str] = None, sort_by_count:
             if x_max:
                 df[x] = df[x].where(lambda _: _ <= x_max, x_max)
 
-    # to string
-    df[x] = df[x].astype(str)
-    if hue is not None:
-        df[hue] = df[hue].astype(str)
+    # to string (top_n_coding casts to string by itself)
+    if not top_nr:
+        df[x] = df[x].astype(str)
+        if hue is not None:
+            df[hue] = df[hue].astype(str)
 
     # if applicable: apply top_n_coding (both x and hue)
     if top_nr:
@@ -2738,28 +2994,37 @@ def df_count(x: str, df: pd.DataFrame, hue: Optional[str] = None, sort_by_count:
         _df_count[_count_hue] = _df_count['count'].sum()
         _df_count[_count_x] = _df_count['count']
     else:
-        _df_count[_count_x] = _df_count.groupby(
-            x)['count'].transform(pd.Series.sum)
-        _df_count[_count_hue] = _df_count.groupby(
-            hue)['count'].transform(pd.Series.sum)
+        _df_count[_count_x] = _df_count.groupby(x, sort=False)['count'].transform('sum')
+        _df_count[_count_hue] = _df_count.groupby(hue, sort=False)['count'].transform('sum')
 
     # sort
     if sort_by_count:
         _df_count = _df_count.sort_values(
             [_count_x], ascending=False).reset_index(drop=True)
 
-    # add perc columns
-    _df_count[f"perc_{x}"] = np.round(
-        _df_count['count'] / _df_count[_count_x] * 100, 2)
-    _df_count[f"perc_{hue}"] = np.round(
-        _df_count['count'] / _df_count[_count_hue] * 100, 2)
+    # add perc columns (both in one go)
+    _perc = np.round(_df_count[['count']].to_numpy(dtype=np.float64) /
+                     _df_count[[_count_x, _count_hue]].to_numpy(dtype=np.float64) * 100, 2)
+    _df_count[f"perc_{x}"] = _perc[:, 0]
+    _df_count[f"perc_{hue}"] = _perc[:, 1]
 
     return _df_count
 
 
 # return prediction accuracy in percent
 def get_accuracy(class_true, class_pred):
-    return np.where(class_true.astype(str) == class_pred.astype(str), 1, 0).sum() / len(class_true)
+    _class_true = np.asarray(class_true)
+    _class_pred = np.asarray(class_pred)
+    # classes are compared as strings, the cast is only needed for mixed dtypes or dtypes that can hold nan
+    if _class_true.dtype != _class_pred.dtype or _class_true.dtype == object:
+        _class_true = _class_true.astype(str)
+        _class_pred = _class_pred.astype(str)
+    elif _class_true.dtype.kind not in 'biuUS':
+        # compare the codes of the (shared) string categories
+        _codes = _str_categorical(pd.Series(np.concatenate([_class_true, _class_pred]))).codes
+        _class_true = _codes[:len(_class_true)]
+        _class_pred = _codes[len(_class_true):]
+    return np.equal(_class_true, _class_pred).mean()
 
 
 # takes a numeric pandas series and splits it into groups, the groups are labeled by INTEGER multiples of the step value
@@ -2767,14 +3032,13 @@ def numeric_to_group(pd_series, step=None, outer_limit=4, suffix=None, use_abs=F
     # outer limit is given in steps, only INTEGER values allowed
     outer_limit = int(outer_limit)
 
-    # make a copy to avoid inplace effects
-    _series = pd.Series(deepcopy(pd_series))
+    # all operations below return new objects -> no need to copy (no copy at all if already float)
+    _series = np.asarray(pd_series, dtype=np.float64)
 
-    # use standard scaler to center around mean with std +- 1
+    # standard scale to center around mean with std +- 1 (like sklearn's StandardScaler, nan are ignored)
     if use_standard_scaler:
-        # noinspection PyUnresolvedReferences
-        _series = StandardScaler().fit(_series.values.reshape(-1, 1)
-                                       ).transform(_series.values.reshape(-1, 1)).flatten()
+        _std = np.nanstd(_series)
+        _series = (_series - np.nanmean(_series)) / (_std if _std > 0 else 1.)
 
     # if step is none: use 1 as step
     if step is None:
@@ -2788,34 +3052,54 @@ def numeric_to_group(pd_series, step=None, outer_limit=4, suffix=None, use_abs=F
     if suffix != '':
         suffix = '_' + suffix
 
-    # to absolute
-    if use_abs:
-        _series = np.abs(_series)
-    else:
-        # gather the +0 and -0 group to 0
-        _series = np.where(np.abs(_series) < step, 0, _series)
-
     # group
-    # divide by step, floor and integer
-    _series = (np.floor(np.abs(_series) / step)).astype(int) * \
-        np.sign(_series).astype(int)
+    # divide absolute value by step, floor and integer (this also gathers the +0 and -0 group to 0)
+    _bins = np.floor(np.abs(_series) / step)
+    # nan end up in the 0 group
+    _bins = np.nan_to_num(_bins, copy=False).astype(int)
 
     # apply outer limit
     if outer_limit is not None:
-        _series = np.where(_series > outer_limit, outer_limit, _series)
-        _series = np.where(_series < -outer_limit, -outer_limit, _series)
+        np.minimum(_bins, outer_limit, out=_bins)
 
-    # make a pretty string
-    # noinspection PyTypeChecker
-    _series = pd.Series(_series).apply(
-        lambda x: '{0:n}'.format(x)).astype('str') + suffix
+    # back to signed groups
+    if not use_abs:
+        np.negative(_bins, out=_bins, where=np.signbit(_series))
+    _series = _bins
+
+    # make a pretty string: only the (few) distinct groups need formatting, the rows are mapped via their codes
+    _groups, _codes = np.unique(_series, return_inverse=True)
+    _labels = np.array(['{0:n}'.format(_group) + suffix for _group in _groups], dtype=object)
+    # categories are sorted by label (like astype('category') on the strings)
+    _order = np.argsort(_labels, kind='stable')
+    _rank = np.empty_like(_order)
+    _rank[_order] = np.arange(len(_order))
 
     # to cat
-    _series = _series.astype('category')
+    _series = pd.Series(pd.Categorical.from_codes(_rank[_codes], categories=_labels[_order]))
 
     return _series
 
 
+def _str_categorical(s: pd.Series) -> pd.Categorical:
+    # same values as s.astype(str) as a categorical with sorted categories, for non object dtypes
+    # only the distinct values are cast to string (objects are cast as is since e.g. 1 and 1.0 hash equal)
+    if s.dtype == object:
+        return pd.Categorical(s.astype(str))
+    _codes, _uniques = pd.factorize(s)
+    _labels = pd.Series(_uniques).astype(str).to_numpy(dtype=object)
+    _na = _codes < 0
+    if _na.any():
+        # missing values keep their string representation ('nan', 'NaT', ...)
+        _na_labels, _na_codes = np.unique(s[_na].astype(str).to_numpy(dtype=object), return_inverse=True)
+        _codes[_na] = len(_labels) + _na_codes
+        _labels = np.concatenate([_labels, _na_labels])
+    # distinct values can share a string representation
+    _categories, _label_codes = np.unique(_labels, return_inverse=True)
+
+    return pd.Categorical.from_codes(_label_codes[_codes], categories=_categories)
+
+
 @export
 def top_n(s: Sequence, n: Union[int, str] = None, w: Optional[Sequence] = None, n_max: int = 20) -> list:
     """
@@ -2835,8 +3119,9 @@ def top_n(s: Sequence, n: Union[int, str] = None, w: Optional[Sequence] = None,
     if isinstance(n, int) or str(n).isnumeric():
         n = int(n)
         if w is None:
-            _df_count = pd.Series(s).value_counts().reset_index()
-            return list(_df_count.sort_values(by=[_df_count.columns[1], 'index'], ascending=[False, True])['index'][:n])
+            # sort by value first so the (stable) sort by count breaks ties by value ascending
+            _counts = pd.Series(s).value_counts().sort_index(kind='mergesort')
+            return _counts.sort_values(ascending=False, kind='mergesort').index[:n].tolist()
         else:
             return pd.DataFrame({'s': s, 'w': w}).groupby('s').agg({'w': 'sum'}) \
                 .sort_values(by='w', ascending=False).index.tolist()[:n]
@@ -2881,24 +3166,22 @@ def top_n_coding(s: Sequence, n: int, other_name: str = 'other', na_to_other: bo
     :return: Adjusted pandas Series
     """
 
-    # we have to cast to string so we can set the other name
-    _s = pd.Series(s).astype('str')
+    # we have to cast to string so we can set the other name, as categorical only the categories need recoding
+    _s = pd.Series(s)
+    _s = pd.Series(_str_categorical(_s), index=_s.index)
     _top_n = top_n(_s, n, w=w)
-    if other_to_na:
-        _s = pd.Series(np.where(_s.isin(_top_n), _s, 'nan'))
-    else:
-        _s = pd.Series(np.where(_s.isin(_top_n), _s, other_name))
+    _categories = _s.cat.categories.to_numpy(dtype=object)
+    _categories = np.where(np.isin(_categories, _top_n), _categories, 'nan' if other_to_na else other_name)
     if na_to_other:
-        _s = np.where(~_s.isin(STRING_NAN), _s, other_name)
-    _s = pd.Series(_s)
+        _categories = np.where(np.isin(_categories, STRING_NAN), other_name, _categories)
+    _categories, _codes = np.unique(_categories, return_inverse=True)
+    _values = pd.Categorical.from_codes(_codes[_s.cat.codes.to_numpy()], categories=_categories)
 
     # get back the old properties of the series (or you'll screw the index)
     if isinstance(s, pd.Series):
-        _s.name = s.name
-        _s.index = s.index
-
-    # convert to cat
-    _s = _s.astype('category')
+        _s = pd.Series(_values, index=s.index, name=s.name)
+    else:
+        _s = pd.Series(_values)
 
     return _s
 
@@ -2906,7 +3189,7 @@ def top_n_coding(s: Sequence, n: int, other_name: str = 'other', na_to_other: bo
 @export
 def k_split(df: pd.DataFrame, k: SequenceOrScalar = 5, groupby: Union[Sequence, str] = None,
             sortby: Union[Sequence, str] = None, random_state: int = None, do_print: bool = True,
-            return_type: Union[str, int] = 0) -> Union[pd.Series, tuple]:
+            return_type: Union[str, int] = 0, n_jobs: int = None) -> Union[pd.Series, tuple]:
     """
     Splits a DataFrame into k (equal sized) parts that can be used for train test splitting or k_cross splitting
 
@@ -2922,6 +3205,8 @@ def k_split(df: pd.DataFrame, k: SequenceOrScalar = 5, groupby: Union[Sequence,
     :param return_type: if one of ['Series', 's'] returns a pandas Series containing the k indices range(k)
         if integer < k returns tuple of shape (df_train, df_test) where the return_type'th part
         is equal to df_test and the other parts are equal to df_train
+    :param n_jobs: if supplied the groups are split in parallel using joblib with this many jobs,
+        -1 uses all processors. By default they are split sequentially [optional]
     :return: depending on return_type either a pandas Series or a tuple
     """
 
@@ -2929,7 +3214,8 @@ def k_split(df: pd.DataFrame, k: SequenceOrScalar = 5, groupby: Union[Sequence,
         tprint(f"k_split: splitting 1:{k} ...")
 
     # -- assert
-    df, groupby = assert_df(df=df, groupby=groupby)
+    # only the _k_index column is added -> a shallow copy is enough
+    df, groupby = assert_df(df=df, groupby=groupby, copy=False)
 
     # -- main
     if is_list_like(k):
@@ -2938,7 +3224,7 @@ def k_split(df: pd.DataFrame, k: SequenceOrScalar = 5, groupby: Union[Sequence,
         if sortby is None:
             raise ValueError(f"k={k} (string, datetime) requires sortby")
         # prepare output df
-        _df_out = df.copy()
+        _df_out = df
         # init k index on first k value
         _df_out['_k_index'] = np.where(
             _df_out[sortby] < k[0], len(k) + 1, len(k))
@@ -2952,34 +3238,62 @@ def k_split(df: pd.DataFrame, k: SequenceOrScalar = 5, groupby: Union[Sequence,
 
         if sortby is None:
             raise ValueError(f"k={k} (string, datetime) requires sortby")
-        _df_out = df.copy()
+        _df_out = df
         _df_out['_k_index'] = np.where(_df_out[sortby] < k, 1, 0)
         k = 1
     else:
-        _df_out = []
-        # - split each group
-        for _index, _df_i in df.groupby(groupby):
-
-            # sort (randomly or by given value)
-            if sortby is None:
-                _df_i = _df_i.sample(frac=1, random_state=random_state)
+        # - split each group: works on the row positions only, the DataFrame is sliced once at the end
+        if sortby is not None:
+            # rank of each row in the (stable) sort order, groups keep their relative order
+            if sortby == 'index':
+                _sort_positions = df.index.argsort(kind='mergesort')
             else:
-                if sortby == 'index':
-                    _df_i = _df_i.sort_index()
+                _sort_positions = df[assert_list(sortby)].reset_index(drop=True).sort_values(
+                    by=sortby, kind='mergesort').index.to_numpy()
+            _sort_rank = np.empty(df.shape[0], dtype=int)
+            _sort_rank[_sort_positions] = np.arange(df.shape[0])
+
+        def _f_k_index(_group_rows: List[np.ndarray]) -> List[Tuple[np.ndarray, np.ndarray]]:
+            # row positions and their k index for each group in _group_rows
+            _out = []
+            for _rows in _group_rows:
+                # sort (randomly or by given value)
+                if sortby is None:
+                    # same permutation as pandas.DataFrame.sample(frac=1, random_state=random_state)
+                    _random_state = np.random if random_state is None else np.random.RandomState(random_state)
+                    _rows = _rows[_random_state.permutation(len(_rows))]
                 else:
-                    _df_i = _df_i.sort_values(by=sortby)
-            # get row numbers in INVERSE order so that key ordering will be inverse
-            # (in case of sorted: new data has k = 0)
-            _df_i[ROW_DUMMY] = range(_df_i.shape[0])[::-1]
-            # assign k index based on row number
-            _row_split = int(np.ceil(_df_i.shape[0] / k))
-            _df_i['_k_index'] = _df_i[ROW_DUMMY] // _row_split
-            # append to list
-            _df_out.append(_df_i)
-        # - merge
-        _df_out = pd.concat(_df_out).sort_index()
-        # drop row dummy
-        _df_out = _df_out.drop(ROW_DUMMY, axis=1)
+                    _rows = _rows[np.argsort(_sort_rank[_rows], kind='mergesort')]
+                # get row numbers in INVERSE order so that key ordering will be inverse
+                # (in case of sorted: new data has k = 0)
+                # assign k index based on row number
+                _row_split = int(np.ceil(len(_rows) / k))
+                _out.append((_rows, np.arange(len(_rows))[::-1] // _row_split))
+            return _out
+
+        _group_rows = list(df.groupby(groupby).indices.values())
+        if n_jobs is None:
+            _results = [_f_k_index(_group_rows)]
+        else:
+            # one task per chunk of groups, dispatching each (small) group on its own would only add overhead
+            _chunk_size = 100
+            _results = Parallel(n_jobs=n_jobs)(delayed(_f_k_index)(_group_rows[_i:_i + _chunk_size])
+                                               for _i in range(0, len(_group_rows), _chunk_size))
+
+        _k_index = np.full(df.shape[0], -1)
+        for _result in _results:
+            for _rows, _k_index_i in _result:
+                _k_index[_rows] = _k_index_i
+        # - rows with na groups are not part of any split
+        _keep = _k_index >= 0
+        if _keep.all():
+            _df_out = df
+        else:
+            _df_out = df[_keep]
+            _k_index = _k_index[_keep]
+        _df_out['_k_index'] = _k_index
+        if not _df_out.index.is_monotonic_increasing:
+            _df_out = _df_out.sort_index()
         # drop groupby dummy
         if GROUPBY_DUMMY in _df_out.columns:
             _df_out = _df_out.drop(GROUPBY_DUMMY, axis=1)
@@ -47,11 +47,11 @@ def install_from_github() -> None:
     if user_response != 'y':
         return None
 
-    # download ZIP archive of GitHub repository
+    # download ZIP archive of GitHub repository, streamed to disk in 1 MiB chunks
     url = about['__download_url__']
-    r = requests.get(url)
-    with open('temp.zip', 'wb') as f:
-        f.write(r.content)
+    with requests.get(url, stream=True) as r, open('temp.zip', 'wb') as f:
+        for chunk in r.iter_content(chunk_size=1 << 20):
+            f.write(chunk)
 
     # extract ZIP file into calling directory
     with ZipFile('temp.zip', 'r') as repo_zip:
@@ -57,6 +57,8 @@ DFOrArray = Union[pd.DataFrame, np.ndarray]
 rcParams = {
     'tprint.r_loc': 'front',
 }
+# --- registry of BaseClass children by __name__, used by from_dict to restore objects
+class_registry = {}
 
 # ---- constants
 # --- true constants
@@ -105,6 +107,10 @@ class BaseClass:
     __dependent_classes__ = []
 
     # --- functions
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        class_registry[cls.__dict__.get('__name__', cls.__name__)] = cls
+
     def __repr__(self):
         return get_repr(self)
 
@@ -134,21 +140,17 @@ class BaseClass:
         for _attr_name in list_merge('__name__', self.__attributes__):
             _attr = self.__getattribute__(_attr_name)
 
-            # - call to children's to_dict
+            # - call to children's to_dict (into new containers so self is left unchanged)
             if recursive:
                 if not isinstance(_attr, pd.DataFrame) and hasattr(_attr, 'to_dict'):
                     _attr = _attr.to_dict()
                 elif is_list_like(_attr):
                     if isinstance(_attr, Mapping):
-                        for _key, _value in _attr.items():
-                            if hasattr(_value, 'to_dict'):
-                                # noinspection PyUnresolvedReferences
-                                _attr[_key] = _value.to_dict()
-                    else:
-                        for _i in range(len(_attr)):
-                            if hasattr(_attr[_i], 'to_dict'):
-                                print(_attr[_i])
-                                _attr[_i] = _attr[_i].to_dict()
+                        # noinspection PyUnresolvedReferences
+                        _attr = {_key: _value.to_dict() if hasattr(_value, 'to_dict') else _value
+                                 for _key, _value in _attr.items()}
+                    elif any(hasattr(_value, 'to_dict') for _value in _attr):
+                        _attr = [_value.to_dict() if hasattr(_value, 'to_dict') else _value for _value in _attr]
 
             _dict[_attr_name] = _attr
 
@@ -171,9 +173,11 @@ class BaseClass:
             for _cla in _classes:
                 if hasattr(_cla, '__name__') and attr == _cla.__name__:
                     _attr_evaluated = _cla()
-            # if no passed class fits the name assume a default name
+            # if no passed class fits the name look it up in the registry of BaseClass children
             if _attr_evaluated is None:
-                _attr_evaluated = eval(attr + '()')
+                if attr not in class_registry:
+                    raise ValueError(f"Unknown class {attr}, pass it via classes")
+                _attr_evaluated = class_registry[attr]()
             # check if the evaluated object has a from dict function
             if hasattr(_attr_evaluated, 'from_dict'):
                 # check if we can pass classes to the sub-function
@@ -229,7 +233,8 @@ class BaseClass:
         :param filename: filename (path) to be used
         :return: None
         """
-        pickle.dump(self, open(filename, 'wb'))
+        with open(filename, 'wb') as _file:
+            pickle.dump(self, _file)
 
     def copy(self):
         """
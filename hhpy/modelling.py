@@ -9,6 +9,8 @@ to provide convenient train test functions.
 
 # ---- imports
 # --- standard imports
+import functools
+import inspect
 import itertools
 import warnings
 import numpy as np
@@ -19,7 +21,9 @@ import seaborn as sns
 # --- third party imports
 from typing import Sequence, Mapping, Union, Callable, Optional, Any, Tuple, List
 
+from sklearn.base import clone
 from sklearn.exceptions import DataConversionWarning
+from joblib import Parallel, delayed
 
 # ---- optional imports
 try:
@@ -82,6 +86,10 @@ docstr = DocstringProcessor(
 )
 
 
+# --- caches
+_varnames_cache = {}
+
+
 # ---- classes
 # noinspection PyPep8Naming
 @docstr
@@ -234,61 +242,60 @@ class Model(BaseClass):
             _indices = k
 
         # -- fit
-        # noinspection PyTypeChecker
-        warnings.simplefilter('ignore', (FutureWarning, DataConversionWarning))
-        # get model by index
-        for _index in _indices:
-            _model = silentcopy(self.base_model)
-            _varnames = _model.fit.__code__.co_varnames
-            _kwargs = kwargs.copy()
-
-            # handle split groupby
-            if split_groupby:
-                # add _groupby column
-                _df = df[lambda _: _['_groupby'] == _index]
-                if df_test is None:
-                    _df_test = None
+        _varnames = _get_varnames(self.base_model, 'fit')
+        # warnings are only suppressed while fitting (restored on exit)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)
+            warnings.simplefilter('ignore', DataConversionWarning)
+            # get model by index
+            for _index in _indices:
+                _model = _clone_model(self.base_model)
+                _kwargs = kwargs.copy()
+
+                # handle split groupby
+                if split_groupby:
+                    # add _groupby column
+                    _df = df[lambda _: _['_groupby'] == _index]
+                    if df_test is None:
+                        _df_test = None
+                    else:
+                        _df_test = df_test[lambda _: _['_groupby'] == _index]
+                    # check if groupby variables in X_ref and clean
+                    for _X_ref in self.X_ref:
+                        for _groupby in groupby:
+                            if _groupby in _X_ref:
+                                self.X_ref = list_exclude(self.X_ref, _X_ref)
                 else:
-                    _df_test = df_test[lambda _: _['_groupby'] == _index]
-                # check if groupby variables in X_ref and clean
-                for _X_ref in self.X_ref:
-                    for _groupby in groupby:
-                        if _groupby in _X_ref:
-                            self.X_ref = list_exclude(self.X_ref, _X_ref)
-            else:
-                _df = df
-                _df_test = df_test
-
-            # - X / y train
-            _X = _df[self.X_ref]
-            _y = _df[self.y_ref]
+                    _df = df
+                    _df_test = df_test
 
-            # - X / y test
-            if _df_test is None:
-                _X_test = X_test
-                _y_test = y_test
-            else:
-                _X_test = _df_test[self.X_ref]
-                _y_test = _df_test[self.y_ref]
-
-            # pass X / y test only if fit can handle it
-            if 'groupby' not in _kwargs.keys() and 'groupby' in _varnames and groupby not in [None, []]:
-                _X = pd.concat([_X, _df[groupby]], axis=1)
-                if _X_test is not None:
-                    _X_test = pd.concat([_X_test, _df_test[groupby]], axis=1)
-                _kwargs['groupby'] = groupby
-            if 'X_test' not in _kwargs.keys() and 'X_test' in _varnames:
-                _kwargs['X_test'] = _X_test
-            if 'y_test' not in _kwargs.keys() and 'y_test' in _varnames:
-                _kwargs['y_test'] = _y_test
+                # - X / y train
+                _X = _df[self.X_ref]
+                _y = _df[self.y_ref]
 
-            _model.fit(X=_X, y=_y, **kwargs)
-            self.model[_index] = _model
-            del _model
+                # - X / y test
+                if _df_test is None:
+                    _X_test = X_test
+                    _y_test = y_test
+                else:
+                    _X_test = _df_test[self.X_ref]
+                    _y_test = _df_test[self.y_ref]
+
+                # pass X / y test only if fit can handle it
+                if 'groupby' not in _kwargs.keys() and 'groupby' in _varnames and groupby not in [None, []]:
+                    _X = pd.concat([_X, _df[groupby]], axis=1)
+                    if _X_test is not None:
+                        _X_test = pd.concat([_X_test, _df_test[groupby]], axis=1)
+                    _kwargs['groupby'] = groupby
+                if 'X_test' not in _kwargs.keys() and 'X_test' in _varnames:
+                    _kwargs['X_test'] = _X_test
+                if 'y_test' not in _kwargs.keys() and 'y_test' in _varnames:
+                    _kwargs['y_test'] = _y_test
+
+                _model.fit(X=_X, y=_y, **_kwargs)
+                self.model[_index] = _model
+                del _model
 
-        # noinspection PyTypeChecker
-        warnings.simplefilter(
-            'default', (FutureWarning, DataConversionWarning))
         self.is_fit = True
 
     @docstr
@@ -336,14 +343,21 @@ class Model(BaseClass):
             split_groupby = self.split_groupby
         if split_groupby is not None:
             df['_groupby'] = concat_cols(df, groupby)
+        # - k_index
+        if k_index is None or split_groupby:
+            _k_values = None
+        else:
+            if isinstance(k_index, pd.Series) and not k_index.index.equals(df.index):
+                k_index = k_index.reindex(df.index)
+            _k_values = np.asarray(k_index)
         # backwards compatibility
-        _ = k_index
         _ = multi
 
         _y_ref_pred = [f"{_}_{self.name}" for _ in self.y_ref]
 
         # - predict using sklearn api
         _df_out = []
+        _positions = []
 
         # loop model dictionary
         for _k, (_key, _model) in enumerate(self.model.items()):
@@ -354,12 +368,17 @@ class Model(BaseClass):
             # get _df and handle split_groupby
             if split_groupby:
                 _df: pd.DataFrame = df[lambda _: _['_groupby'] == _key]
+            elif _k_values is not None:
+                # each k model predicts only its own test rows
+                _rows = np.flatnonzero(_k_values == _key)
+                _df = df.iloc[_rows].assign(_k_model=_k)
+                _positions.append(_rows)
             else:
                 _df = df.copy()
                 _df['_k_model'] = _k
 
             # - handle kwargs
-            _varnames = _model.predict.__code__.co_varnames
+            _varnames = _get_varnames(_model, 'predict')
             # groupby
             if 'groupby' not in _kwargs.keys() and 'groupby' in _varnames:
                 _X = _df[self.X_ref + groupby]  # .dropna()
@@ -440,7 +459,16 @@ class Model(BaseClass):
             #     for _col, __y_ref_pred in enumerate(assert_list(_y_ref_pred)):
             #         _df[__y_ref_pred] = np.where(k_index == _k, _y_pred[_y_pred.columns[_col]], _df[__y_ref_pred])
         # concat
-        _df_out = pd.concat(_df_out)
+        if _k_values is None:
+            _df_out = pd.concat(_df_out)
+        else:
+            # restore the order of df, rows that belong to no k model get NaN predictions
+            _positions = np.concatenate(_positions)
+            _rows_missing = np.setdiff1d(np.arange(df.shape[0]), _positions)
+            if len(_rows_missing) > 0:
+                _df_out.append(df.iloc[_rows_missing])
+                _positions = np.concatenate([_positions, _rows_missing])
+            _df_out = pd.concat(_df_out).iloc[np.argsort(_positions, kind='stable')]
 
         # special case if there is only one target (most algorithms support only one)
         if len(self.y_ref) == 1:
@@ -586,13 +614,14 @@ class Models(BaseClass):
         # None case
         if self.df is None or self.fit_type is None:
             return None
+        _k_index = self.df['_k_index'].to_numpy()
         # train-test case
         if self.fit_type == 'train_test':
-            return self.df[lambda _: _['_k_index'] == self.k_tests[0]]
+            return self.df[_k_index == self.k_tests[0]]
         # k-cross case
         _df_tests = []
         for _k_test in self.k_tests:
-            _df_tests.append(self.df[lambda _: _['_k_index'] == _k_test])
+            _df_tests.append(self.df[_k_index == _k_test])
         return _df_tests
 
     def reset(self) -> None:
@@ -630,6 +659,19 @@ class Models(BaseClass):
         _k_index = k_split(df=self.df, return_type='s', **kwargs)
         self.df['_k_index'] = _k_index
 
+    @docstr
+    def _get_columns(self, groupby: SequenceOrScalar = None) -> list:
+        """
+        get the columns of self.df used by any of the models for fitting / predicting
+
+        :param groupby: %(groupby)s
+        :return: list of column names
+        """
+        _cols = list_merge(self.X_ref, self.y_ref, groupby, '_k_index')
+        for _model in self.models:
+            _cols = list_merge(_cols, _model.X_ref, _model.y_ref, _model.groupby)
+        return [_col for _col in _cols if _col in self.df.columns]
+
     @docstr
     def model_by_name(self, name: Union[list, str]) -> Union[Model, list]:
         """
@@ -650,7 +692,7 @@ class Models(BaseClass):
 
     @docstr
     def fit(self, fit_type: str = 'train_test', k_test: Optional[int] = 0, groupby: SequenceOrScalar = None,
-            do_print: bool = True, **kwargs):
+            do_print: bool = True, n_jobs: int = None, **kwargs):
         """
         fit all Model objects in collection
 
@@ -658,6 +700,9 @@ class Models(BaseClass):
         :param k_test: which k_index to use as test data
         :param groupby: %(groupby)s
         :param do_print: %(do_print)s
+        :param n_jobs: if supplied the models are fit in parallel processes using joblib with this many jobs,
+            -1 uses all processors. Only worth it if fitting takes much longer than copying the data to the
+            processes. By default they are fit sequentially [optional]
         :param kwargs: Other keyword arguments passed to :func:`~Model.fit`
         :return: None
         """
@@ -670,21 +715,27 @@ class Models(BaseClass):
         # -- init
         if groupby is None:
             groupby = self.groupby
-        # get df
-        _df = self.df.copy()
+        # get df: the folds are selected by mask (which creates new DataFrames) so self.df only needs to be copied
+        # if the scalers write to it, in which case only the columns used for fitting are copied
+        if self.scaler_X is None and self.scaler_y is None:
+            _df = self.df
+        else:
+            _df = self.df[self._get_columns(groupby=groupby)]
         # groupby and k index
         # -- apply scaler to X and y separately
-        warnings.simplefilter('ignore', DataConversionWarning)
-        # 0 column features cannot be scaled
-        if self.scaler_X is not None and _df[self.X_ref].shape[1] > 0:
-            self.scaler_X = self.scaler_X.fit(_df[self.X_ref])
-            _df[self.X_ref] = self.scaler_X.transform(_df[self.X_ref])
-        else:
-            self.scaler_X = None
-        if self.scaler_y is not None:
-            self.scaler_y = self.scaler_y.fit(_df[self.y_ref])
-            _df[self.y_ref] = self.scaler_y.transform(_df[self.y_ref])
-        warnings.simplefilter('default', DataConversionWarning)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DataConversionWarning)
+            # 0 column features cannot be scaled
+            _df_X = _df[self.X_ref]
+            if self.scaler_X is not None and _df_X.shape[1] > 0:
+                self.scaler_X = self.scaler_X.fit(_df_X)
+                _df[self.X_ref] = self.scaler_X.transform(_df_X)
+            else:
+                self.scaler_X = None
+            if self.scaler_y is not None:
+                _df_y = _df[self.y_ref]
+                self.scaler_y = self.scaler_y.fit(_df_y)
+                _df[self.y_ref] = self.scaler_y.transform(_df_y)
         # split
         if fit_type == 'train_test':
             _k_tests = [k_test]
@@ -694,18 +745,32 @@ class Models(BaseClass):
         else:  # fit_type == 'final'
             _k_tests = [-1]
         # get df train and df test
+        _k_index = _df['_k_index'].to_numpy()
         for _k_test in _k_tests:
 
-            _df_train = _df[lambda _: _['_k_index'] != _k_test]
-            _df_test = _df[lambda _: _['_k_index'] == _k_test]
+            _test_mask = _k_index == _k_test
+            _df_train = _df[~_test_mask]
+            _df_test = _df[_test_mask]
 
-            for _model in self.models:
+            _kws_fit = dict(X=self.X_ref, y=self.y_ref, df=_df_train, df_test=_df_test, groupby=groupby, k=_k_test,
+                            **kwargs)
 
-                if do_print:
-                    self.printf('fitting model {}...'.format(_model.name))
+            if n_jobs is None or len(self.models) < 2:
+                for _model in self.models:
+
+                    if do_print:
+                        self.printf('fitting model {}...'.format(_model.name))
 
-                _model.fit(X=self.X_ref, y=self.y_ref, df=_df_train, df_test=_df_test, groupby=groupby,
-                           k=_k_test, **kwargs)
+                    _model.fit(**_kws_fit)
+            else:
+                if do_print:
+                    self.printf('fitting models {}...'.format(', '.join(self.model_names)))
+                # fit does not reliably release the GIL: use processes and copy the fitted state back so that
+                # references to the original Model objects stay valid
+                _fitted_models = Parallel(n_jobs=n_jobs, prefer='processes')(
+                    delayed(_fit_model)(_model, **_kws_fit) for _model in self.models)
+                for _model, _fitted_model in zip(self.models, _fitted_models):
+                    _model.__dict__.update(_fitted_model.__dict__)
 
         self.fit_type = fit_type
         self.k_tests = _k_tests
@@ -714,7 +779,8 @@ class Models(BaseClass):
     def predict(
             self, X: Union[DFOrArray, SequenceOrScalar] = None, y: Union[DFOrArray, SequenceOrScalar] = None,
             df: pd.DataFrame = None, return_type: str = 'self', ensemble: bool = False, k_predict_type: str = 'test',
-            groupby: SequenceOrScalar = None, multi: SequenceOrScalar = None, do_print: bool = True, **kwargs
+            groupby: SequenceOrScalar = None, multi: SequenceOrScalar = None, do_print: bool = True,
+            n_jobs: int = None, **kwargs
     ) -> Optional[Union[pd.Series, pd.DataFrame]]:
         """
         predict with all models in collection
@@ -728,6 +794,8 @@ class Models(BaseClass):
         :param groupby: %(groupby)s
         :param multi: %(multi)s
         :param do_print: %(do_print)s
+        :param n_jobs: if supplied the models predict in parallel threads using joblib with this many jobs,
+            -1 uses all processors. By default they predict sequentially [optional]
         :param kwargs: other keyword arguments passed to Model.predict [optional]
         :return: if return_type is self: None, else see Model.predict
         """
@@ -749,17 +817,42 @@ class Models(BaseClass):
                     df = pd.concat([X, y], axis=1)
                 else:
                     df = X
+            # the scalers transform df inplace -> only copy self.df if there is a scaler
+            elif self.scaler_X is None and self.scaler_y is None:
+                df = self.df
             else:
                 df = self.df.copy()
 
         # - handle scaler transformation
-        warnings.simplefilter('ignore', DataConversionWarning)
-        if self.scaler_X is not None:
-            df[self.X_ref] = self.scaler_X.transform(df[self.X_ref])
-        if self.scaler_y is not None:
-            df[self.y_ref] = self.scaler_y.transform(df[self.y_ref])
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DataConversionWarning)
+            if self.scaler_X is not None:
+                df[self.X_ref] = self.scaler_X.transform(df[self.X_ref])
+            if self.scaler_y is not None:
+                df[self.y_ref] = self.scaler_y.transform(df[self.y_ref])
+
+        # -- functions
+        def _f_predict(_model, _k_index):
+
+            _y_pred_scaled = _model.predict(
+                df=df, groupby=groupby, k_index=_k_index, **kwargs)
 
-        _y_preds = []
+            # - handle scaler inverse transformation
+            if self.scaler_y is None:
+                return silentcopy(_y_pred_scaled)
+
+            _y_pred_scaled = np.asarray(_y_pred_scaled, dtype=float).reshape(len(_y_pred_scaled), -1)
+            # if the model is predicting only a subset of ys we need to scatter into the full width before we scale
+            if _model.y_ref == self.y_ref:
+                return pd.DataFrame(self.scaler_y.inverse_transform(_y_pred_scaled), columns=self.y_ref)
+            _y_idx = [_y_ref_index[_] for _ in _model.y_ref]
+            _y_pred_full = np.full((_y_pred_scaled.shape[0], len(self.y_ref)), np.nan)
+            _y_pred_full[:, _y_idx] = _y_pred_scaled
+            return pd.DataFrame(self.scaler_y.inverse_transform(_y_pred_full)[:, _y_idx], columns=_model.y_ref)
+
+        # -- main
+        _y_ref_index = {_y_ref: _i for _i, _y_ref in enumerate(self.y_ref)}
+        _tasks = []
         _y_ref_preds = []
         _model_names = []
 
@@ -784,29 +877,15 @@ class Models(BaseClass):
             else:
                 _y_ref_preds += [f"{_}_{_model.name}" for _ in _model.y_ref]
 
-            _y_pred_scaled = _model.predict(
-                df=df, groupby=groupby, k_index=_k_index, **kwargs)
+            _tasks.append((_model, _k_index))
 
-            # - handle scaler inverse transformation
-            if self.scaler_y is None:
-                _y_pred = silentcopy(_y_pred_scaled)
+        # most estimators release the GIL while predicting so threads suffice
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DataConversionWarning)
+            if n_jobs is None or len(_tasks) < 2:
+                _y_preds = [_f_predict(*_task) for _task in _tasks]
             else:
-                _df_y_pred_scaled = pd.DataFrame(_y_pred_scaled)
-                _df_y_pred_scaled.columns = _model.y_ref
-                # if the model is predicting only a subset of ys we need to reshape before we scale
-                if _model.y_ref != self.y_ref:
-                    for _col in self.y_ref:
-                        if _col not in _model.y_ref:
-                            _df_y_pred_scaled[_col] = np.nan
-                    # ensure correct order
-                    _df_y_pred_scaled = _df_y_pred_scaled[self.y_ref]
-
-                _df_y_pred = self.scaler_y.inverse_transform(_df_y_pred_scaled)
-                _df_y_pred = pd.DataFrame(_df_y_pred)
-                _df_y_pred.columns = self.y_ref
-                _y_pred = _df_y_pred[_model.y_ref]
-            _y_preds.append(_y_pred)
-        warnings.simplefilter('default', DataConversionWarning)
+                _y_preds = Parallel(n_jobs=n_jobs, prefer='threads')(delayed(_f_predict)(*_task) for _task in _tasks)
 
         _df = pd.concat(_y_preds, axis=1, sort=False)
 
@@ -837,23 +916,28 @@ class Models(BaseClass):
         if ensemble:
             # drop duplicates
             _model_names = list(set(_model_names))
-            # get all combinations
-            for _comb in list(itertools.combinations(_model_names, 2)) + list(itertools.combinations(_model_names, 3)):
-                for _y_ref in self.y_ref:
-                    _comb_name = '_'.join(_comb)
-                    _y_comb_name = '{}_{}'.format(_y_ref, _comb_name)
-                    _cols = []
-                    for _element in _comb:
-                        _cols.append('{}_{}'.format(_y_ref, _element))
-                    _df[_y_comb_name] = _df[_cols].mean(axis=1)
-                    if _comb_name not in self.model_names:
-                        self.model_names.append(_comb_name)
+            _weights, _comb_names = _get_ensemble_combinations(tuple(_model_names))
+            # nan skipping mean of all combinations for all y_refs as one product of shape (rows, combs, y_refs)
+            _values = _df[[f"{_y_ref}_{_name}" for _y_ref in self.y_ref for _name in _model_names]]\
+                .to_numpy(dtype=float).reshape(_df.shape[0], len(self.y_ref), len(_model_names))
+            _isna = np.isnan(_values)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                _means = np.einsum('rmn,kn->rkm', np.where(_isna, 0, _values), _weights) / \
+                    np.einsum('rmn,kn->rkm', (~_isna).astype(float), _weights)
+            _y_comb_names = [f"{_y_ref}_{_comb_name}" for _comb_name in _comb_names for _y_ref in self.y_ref]
+            self.model_names += list_exclude(_comb_names, self.model_names)
+            # one block for all ensemble columns, ordered by combination then y_ref
+            _df = pd.concat([_df, pd.DataFrame(_means.reshape(_df.shape[0], -1), index=_df.index,
+                                               columns=_y_comb_names)], axis=1)
 
         if return_type == 'self':
-            for _col in _df.columns:
-                self.df[_col] = _df[_col]
-                if _col not in self.y_pred:
-                    self.y_pred.append(_col)
+            # - bulk assign: overwrite existing prediction columns in place and concat the new ones once
+            _df = _df.reindex(self.df.index)
+            _cols_existing = list_intersection(_df.columns, self.df.columns)
+            if _cols_existing:
+                self.df[_cols_existing] = _df[_cols_existing]
+            self.df = pd.concat([self.df, _df[list_exclude(_df.columns, _cols_existing)]], axis=1)
+            self.y_pred += list_exclude(_df.columns, self.y_pred)
         elif return_type in ['df', 'DataFrame']:
             return _df
         elif return_type in ['df_full']:
@@ -884,7 +968,8 @@ class Models(BaseClass):
         assert (return_type in _valid_return_types),\
             f"return_type must be one of {_valid_return_types}"
         groupby = assert_list(groupby)
-        _df = self.df.copy()
+        # _df is only filtered / concatenated, never modified inplace -> no need to copy
+        _df = self.df
 
         # -- init
         if do_print:
@@ -895,7 +980,15 @@ class Models(BaseClass):
         elif self.fit_type == 'k_cross':
             groupby.append('_k_index')
         elif self.fit_type == 'train_test':
-            _df = _df[lambda _: _['_k_index'].isin(self.k_tests)]
+            _df = _df[np.isin(_df['_k_index'].to_numpy(), self.k_tests)]
+
+        # - add missing predictions: all models predict once per call (not once per missing column)
+        _y_ref_preds = [f"{_y_ref}_{_model.name}" for _model in self.models for _y_ref in _model.y_ref]
+        if list_exclude(_y_ref_preds, _df.columns):
+            # predict gets only the used columns, the projection is a new DataFrame for the scalers to transform
+            _df_pred = self.predict(df=_df[self._get_columns(groupby=self.groupby)], return_type='df',
+                                    do_print=do_print)
+            _df = pd.concat([_df.drop(list_intersection(_df.columns, _df_pred.columns), axis=1), _df_pred], axis=1)
 
         _df_score = df_score(df=_df, y_true=self.y_ref, pred_suffix=self.model_names, pivot=pivot, groupby=groupby,
                              multi=self.multi, **kwargs)
@@ -1066,6 +1159,72 @@ class Models(BaseClass):
 
 
 # ---- functions
+# --- internal functions
+def _get_varnames(obj: Any, method: str) -> frozenset:
+    """
+    get the parameter names of a method of obj, cached per class since fit / predict are called once per fold
+
+    :param obj: object implementing the method
+    :param method: name of the method
+    :return: frozenset of parameter names
+    """
+    _key = (type(obj), method)
+    if _key not in _varnames_cache:
+        # only the parameters (__code__.co_varnames would also contain the local variables)
+        _varnames_cache[_key] = frozenset(inspect.signature(getattr(obj, method)).parameters)
+    return _varnames_cache[_key]
+
+
+def _clone_model(model: object) -> object:
+    """
+    get an unfitted copy of a model for fitting, sklearn like models are cloned from their constructor params
+    instead of deep copying the whole object
+
+    :param model: model object
+    :return: copy of the model
+    """
+    if hasattr(model, 'get_params'):
+        try:
+            return clone(model)
+        except (TypeError, RuntimeError):
+            # get_params does not reflect the constructor params
+            pass
+    return silentcopy(model)
+
+
+@functools.lru_cache()
+def _get_ensemble_combinations(model_names: tuple) -> Tuple[np.ndarray, list]:
+    """
+    get the 2 and 3 model combinations used by Models.predict(ensemble=True), cached since they only depend
+    on the model names
+
+    :param model_names: tuple of unique model names
+    :return: tuple of (weight matrix selecting the members of each combination, combination names)
+    """
+    _combs = list(itertools.combinations(range(len(model_names)), 2)) + \
+        list(itertools.combinations(range(len(model_names)), 3))
+    _weights = np.zeros((len(_combs), len(model_names)))
+    for _i, _comb in enumerate(_combs):
+        _weights[_i, list(_comb)] = 1
+    # the cached weights are shared between calls -> read only
+    _weights.flags.writeable = False
+    _comb_names = ['_'.join([model_names[_] for _ in _comb]) for _comb in _combs]
+    return _weights, _comb_names
+
+
+def _fit_model(model: Model, **kwargs) -> Model:
+    """
+    fit a Model and return it, used by Models.fit to retrieve the fitted state from parallel processes
+
+    :param model: Model to fit
+    :param kwargs: keyword arguments passed to :func:`~Model.fit`
+    :return: the fitted Model
+    """
+    model.fit(**kwargs)
+    return model
+
+
+# --- exported functions
 @export
 def assert_array(a: Any, return_name: bool = False, name_default: str = 'name') -> Union[Tuple[np.ndarray, str],
                                                                                          np.ndarray]:
@@ -1161,13 +1320,12 @@ def get_coefs(model: Any, y: SequenceOrScalar):
     assert (hasattr(_model, 'coef_')
             ), 'Attribute coef_ not available, did you specify a linear model?'
 
-    _coef = _model.coef_.tolist()
-    _coef.append(model.intercept_)
+    # one float array for coefficients and intercept, no python float objects
+    _coef = np.concatenate([np.asarray(_model.coef_, dtype=float).ravel(),
+                            np.atleast_1d(np.asarray(_model.intercept_, dtype=float))])
 
-    _df = pd.DataFrame()
-    _df['feature'] = assert_list(y) + ['intercept']
-    _df['coef'] = _coef
-    _df = _df.sort_values(['coef'], ascending=False).reset_index(drop=True)
+    _df = pd.DataFrame({'feature': assert_list(y) + ['intercept'], 'coef': _coef})
+    _df = _df.sort_values(['coef'], ascending=False, ignore_index=True)
 
     return _df
 
@@ -1187,72 +1345,76 @@ def get_feature_importance(
 
     def _get_feature_importance_rf(__model, __predictors, __features_to_sum: Mapping = None):
 
-        # init df for feature importances
-        ___df = pd.DataFrame({
-            'feature': __predictors,
-            'importance': __model.feature_importances_
-        })
+        # work on plain arrays, the DataFrame is only created for returning
+        _features = np.asarray(assert_list(__predictors), dtype=object)
+        _importances = np.asarray(__model.feature_importances_, dtype=float)
 
-        # if applicable: sum features
-        if __features_to_sum is not None:
-            for _key in list(__features_to_sum.keys()):
-                ___df['feature'] = np.where(___df['feature'].isin(
-                    __features_to_sum[_key]), _key, ___df['feature'])
-                ___df = ___df.groupby('feature').sum().reset_index()
+        # if applicable: sum features, mapping each feature to its key (first key wins) and grouping once
+        if __features_to_sum:
+            _feature_keys = {}
+            for _key, _features_key in __features_to_sum.items():
+                for _feature in assert_list(_features_key):
+                    _feature_keys.setdefault(_feature, _key)
+            _features = np.array([_feature_keys.get(_feature, _feature) for _feature in _features], dtype=object)
+            # unique features are sorted by name like groupby
+            _features, _inverse = np.unique(_features, return_inverse=True)
+            _importances = np.bincount(_inverse, weights=_importances, minlength=len(_features))
 
-        ___df = ___df.sort_values(
-            ['importance'], ascending=False).reset_index(drop=True)
-        ___df['importance'] = np.round(___df['importance'], 5)
+        # sum on full precision, then round the sorted copy once in place
+        _order = np.argsort(-_importances, kind='stable')
+        _importances = _importances[_order]
+        np.round(_importances, 5, out=_importances)
 
-        return ___df
+        return pd.DataFrame({'feature': _features[_order], 'importance': _importances})
 
     # get feature importance of a decision tree like model in a sorted data frame
     def _get_feature_importance_xgb(_f_model, _f_predictors, _f_features_to_sum=None):
         # get f_score
         _f_score = _f_model.get_booster().get_fscore()
 
-        # init df to return
-        __df = pd.DataFrame()
-
-        # get predictor code
-        __df['feature_code'] = list(_f_score.keys())
-        __df['feature_code'] = __df['feature_code'].str[1:].astype(int)
+        # get predictor code (keys are of the form 'f<position>') and code importance
+        _n_score = len(_f_score)
+        _feature_codes = np.fromiter((int(_key[1:]) for _key in _f_score.keys()), dtype=np.int64, count=_n_score)
+        _importances_abs = np.fromiter(_f_score.values(), dtype=np.float64, count=_n_score)
 
-        # code importance
-        __df['importance_abs'] = list(_f_score.values())
-        __df['importance'] = __df['importance_abs'] / \
-            __df['importance_abs'].sum()
+        # init df to return
+        __df = pd.DataFrame({'feature_code': _feature_codes, 'importance': _importances_abs / _importances_abs.sum()})
 
-        __df = __df.sort_values(['feature_code']).reset_index(drop=True)
+        __df = __df.sort_values('feature_code', ignore_index=True, kind='stable')
 
-        __df['feature'] = [_f_predictors[x]
-                           for x in range(len(_f_predictors)) if x in __df['feature_code']]
+        # the feature code is the position of the predictor
+        __df['feature'] = np.asarray(_f_predictors, dtype=object)[__df['feature_code'].to_numpy()]
 
-        if _f_features_to_sum is not None:
+        if _f_features_to_sum:
 
             for _key in list(_f_features_to_sum.keys()):
                 __df['feature'] = np.where(__df['feature'].isin(
                     _f_features_to_sum[_key]), _key, __df['feature'])
                 __df = __df.groupby('feature').sum().reset_index()
 
-        __df = __df.sort_values(
-            ['importance'], ascending=False).reset_index(drop=True)
-
-        __df['importance'] = np.round(__df['importance'], 5)
+        __df = __df[['feature', 'importance']].sort_values('importance', ascending=False, ignore_index=True,
+                                                           kind='stable')
 
-        __df = __df[['feature', 'importance']]
+        # round once in place after summing
+        _importances = __df['importance'].to_numpy(dtype=float)
+        np.round(_importances, 5, out=_importances)
 
-        return __df
+        return pd.DataFrame({'feature': __df['feature'].to_numpy(), 'importance': _importances})
 
     # -- main
-    try:
+    if not hasattr(model, 'get_booster'):
+        # decision tree like models: errors are not masked by the XGBoost fallback
         # noinspection PyTypeChecker
         _df = _get_feature_importance_rf(model, predictors, features_to_sum)
-        # this is supposed to also work for XGBoost but it was broken in a recent release
-        # so below serves as fallback
-    except ValueError:
-        # noinspection PyTypeChecker
-        _df = _get_feature_importance_xgb(model, predictors, features_to_sum)
+    else:
+        try:
+            # noinspection PyTypeChecker
+            _df = _get_feature_importance_rf(model, predictors, features_to_sum)
+            # this is supposed to also work for XGBoost but it was broken in a recent release
+            # (feature_importances_ raises a ValueError) so below serves as fallback
+        except ValueError:
+            # noinspection PyTypeChecker
+            _df = _get_feature_importance_xgb(model, predictors, features_to_sum)
 
     return _df
 
@@ -4,6 +4,7 @@ tests for hhpy.ds
 
 import pytest
 import hhpy.ds as hds
+import numpy as np
 import pandas as pd
 import os
 
@@ -39,3 +40,145 @@ def test_dfmapping_from_excel():
     _testdata_jp_dfmapping = hds.DFMapping(_path)
     # print(_testdata_jp_dfmapping)
     assert _testdata_jp_dfmapping.col_mapping and _testdata_jp_dfmapping.value_mapping
+
+
+def test_optimize_pd_float_precision():
+    # floats are only downcast if they keep their precision
+    _df = pd.DataFrame({'large': [16777217., 1.5], 'precise': [-769494.8733, 2.], 'small': [1.5, np.nan]})
+    _df_optimized = hds.optimize_pd(_df, convert_dtypes=False)
+    assert _df_optimized['large'].dtype == np.float64 and _df_optimized['precise'].dtype == np.float64
+    assert _df_optimized['small'].dtype == np.float32
+    pd.testing.assert_frame_equal(_df_optimized.astype(np.float64), _df)
+
+
+def test_mahalanobis_inplace_change():
+    # changing the reference DataFrame inplace must not return cached distances
+    _df = pd.DataFrame(np.random.default_rng(0).normal(size=(50, 2)), columns=['x', 'y'])
+    _distances = hds.mahalanobis(_df, do_print=False)
+    _df.loc[1:10, 'x'] = 50.
+    _distances_changed = hds.mahalanobis(_df, do_print=False)
+    _df_copy = _df.copy()
+    assert not np.isclose(_distances[0], _distances_changed[0])
+    assert np.allclose(_distances_changed, hds.mahalanobis(_df_copy, do_print=False))
+
+
+def test_quantile_split_nan():
+    # missing and infinite values get their own 'nan' label
+    _s = pd.Series(np.arange(20, dtype=float), index=np.arange(20) * 2, name='x')
+    _s.iloc[[0, 5]] = [np.nan, np.inf]
+    _s_split = hds.quantile_split(_s, 4)
+    assert _s_split.index.equals(_s.index) and _s_split.name == 'x'
+    assert _s_split.cat.categories[0] == 'nan'
+    assert (_s_split == 'nan').tolist() == (~np.isfinite(_s)).tolist()
+    assert _s_split.isna().sum() == 0
+
+
+def test_df_score_string_scores():
+    # scores can be passed by name
+    _rng = np.random.default_rng(0)
+    _df = pd.DataFrame({'y': _rng.normal(size=40)})
+    _df['y_m'] = _df['y'] + _rng.normal(0, .1, 40)
+    _df_score = hds.df_score(_df, y_true='y', pred_suffix=['m'], scores=['r2', 'rmse'])
+    _df_score_funcs = hds.df_score(_df, y_true='y', pred_suffix=['m'], scores=[hds.r2, hds.rmse])
+    pd.testing.assert_frame_equal(_df_score, _df_score_funcs)
+    assert list(_df_score.columns) == ['r2', 'rmse']
+
+
+def test_df_split_keys():
+    # one key per group in the 'col==value' format
+    _df = pd.DataFrame({'g': ['a', 'b', 'a', 'c'], 'h': [1, 1, 2, 2], 'v': [1., 2., 3., 4.]})
+    _dfs = hds.df_split(_df, 'g')
+    assert list(_dfs.keys()) == ['a', 'b', 'c']
+    pd.testing.assert_frame_equal(_dfs['a'], _df.iloc[[0, 2]])
+    _dfs = hds.df_split(_df, ['g', 'h'], print_key=True)
+    assert list(_dfs.keys()) == ['g==a_h==1', 'g==a_h==2', 'g==b_h==1', 'g==c_h==2']
+    assert len(hds.df_split(_df, 'g', return_type='list')) == 3
+
+
+def test_rel_acc_integer_labels():
+    # the most common class is used regardless of its label
+    assert hds.rel_acc(pd.Series([1, 1, 1, 0]), pd.Series([1, 1, 1, 1])) == 0
+    assert hds.rel_acc(pd.Series([1, 1, 1, 0]), pd.Series([1, 1, 1, 0])) == .25
+
+
+def test_resample_groupby():
+    # integer index is binned by rule, by group if applicable
+    _df = pd.DataFrame({'v': np.arange(8.), 'g': list('aabbaabb')})
+    _df_resampled = hds.resample(_df, rule=2, groupby='g')
+    assert _df_resampled.index.tolist() == [('a', 0.), ('a', 4.), ('b', 2.), ('b', 6.)]
+    assert _df_resampled['v'].tolist() == [.5, 4.5, 2.5, 6.5]
+    _df_resampled = hds.resample(_df, rule=2, columns=['v'], agg='max')
+    assert _df_resampled['v_max'].tolist() == [1., 3., 5., 7.]
+    # empty bins are included
+    _df_resampled = hds.resample(_df.iloc[[0, 1, 6, 7]], rule=2, agg='sum')
+    assert _df_resampled['v'].tolist() == [1., 0., 0., 13.]
+
+
+def test_outlier_to_nan():
+    # points whose delta is outside the std range of the group's deltas are set to nan, missing values interpolated
+    _values = np.tile([1., 2.], 20)
+    _values[10] = 100.
+    _values[25] = np.nan
+    _df = pd.DataFrame({'v': _values, 'g': np.repeat(['a', 'b'], 20)}, index=np.arange(40) * 3)
+    for _groupby in [None, 'g']:
+        _s = hds.outlier_to_nan(_df, 'v', groupby=_groupby)
+        assert _s.index.equals(_df.index) and _s.name == 'v'
+        assert _s[_s.isna()].index.tolist() == [30]
+        assert _s.iloc[25] == 1.
+    # the input is not modified
+    assert _df['v'].isna().sum() == 1 and _df['v'].iloc[10] == 100.
+
+
+def test_f1_pr_unnamed():
+    # unnamed vectors are compared against each other, not with themselves
+    _y_true = pd.Series([1, 2, 1, 3])
+    _y_pred = pd.Series([1, 2, 2, 3])
+    _cm = hds.cm(_y_true, _y_pred)
+    assert _cm.to_numpy().tolist() == [[1, 1, 0], [0, 1, 0], [0, 0, 1]]
+    _f1_pr = hds.f1_pr(_y_true, _y_pred, target=1)
+    assert _f1_pr.index.name == 'y_true'
+    assert _f1_pr.loc[1, 'precision'] == 100. and _f1_pr.loc[1, 'recall'] == 50.
+    _df = pd.DataFrame({'t': _y_true, 'p': _y_pred})
+    pd.testing.assert_frame_equal(hds.f1_pr('t', 'p', df=_df).rename_axis('y_true'), hds.f1_pr(_y_true, _y_pred))
+
+
+def test_acc_empty():
+    # undefined accuracies are nan instead of raising
+    assert np.isnan(hds.acc(pd.Series([], dtype=int), pd.Series([], dtype=int)))
+    assert np.isnan(hds.rel_acc(pd.Series([], dtype=int), pd.Series([], dtype=int)))
+    assert np.isnan(hds.rel_acc(pd.Series([1, 1, 0]), pd.Series([1, 0, 0]), target_class=2))
+    assert hds.rel_acc(pd.Series([1, 1, 0]), pd.Series([1, 0, 0]), target_class=1) == .5 - 2 / 3
+
+
+def test_lfit_degenerate():
+    # less than two distinct x values: warn and return the minimum norm fit like numpy.polyfit
+    with pytest.warns(np.RankWarning):
+        _y_fit = hds.lfit(pd.Series([1.], name='x'), pd.Series([2.], name='y'), do_print=False)
+    assert np.allclose(_y_fit, [2.])
+    _df = pd.DataFrame({'x': [1., 2., 3., 5., 5.], 'y': [1., 2., 2., 4., 6.], 'g': ['a', 'a', 'a', 'b', 'b']})
+    with pytest.warns(np.RankWarning):
+        _y_fit = hds.lfit('x', 'y', df=_df, groupby='g', do_print=False)
+    assert np.allclose(_y_fit, [7 / 6, 5 / 3, 13 / 6, 5., 5.])
+
+
+def test_butter_pass_filter_band():
+    # band filters take an array of two cutoffs
+    _data = pd.Series(np.sin(np.arange(200) / 3.) + np.random.default_rng(0).normal(size=200))
+    _y = hds.butter_pass_filter(_data, cutoff=np.array([1, 3]), fs=20, order=2, btype='band')
+    assert _y.shape == (200,) and np.isfinite(_y).all()
+    np.testing.assert_allclose(_y, hds.butter_pass_filter(_data, cutoff=[1, 3], fs=20, order=2, btype='band'))
+    assert not np.allclose(_y, hds.butter_pass_filter(_data, cutoff=np.array([1, 3]), fs=20, order=2,
+                                                      btype='bandstop'))
+
+
+def test_resample_kwargs():
+    # DataFrame.resample kwargs like closed / label are supported
+    _df = pd.DataFrame({'v': np.arange(8.), 'g': list('aabbaabb')})
+    _df_resampled = hds.resample(_df, rule=2, closed='right')
+    assert _df_resampled.index.tolist() == [-2., 0., 2., 4., 6.]
+    assert _df_resampled['v'].tolist() == [0., 1.5, 3.5, 5.5, 7.]
+    _df_resampled = hds.resample(_df, rule=2, closed='right', label='right')
+    assert _df_resampled.index.tolist() == [0., 2., 4., 6., 8.]
+    _df_resampled = hds.resample(_df, rule=2, groupby='g', closed='right')
+    assert _df_resampled.index.tolist() == [('a', -2.), ('a', 0.), ('a', 2.), ('a', 4.), ('b', 0.), ('b', 2.),
+                                            ('b', 4.), ('b', 6.)]
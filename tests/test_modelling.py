@@ -0,0 +1,125 @@
+"""
+tests for hhpy.modelling
+"""
+
+import pytest
+from types import SimpleNamespace
+import hhpy.modelling as hmod
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.tree import DecisionTreeRegressor
+
+
+# --- fixtures
+@pytest.fixture
+def testdata_reg():
+    _rng = np.random.default_rng(0)
+    _df = pd.DataFrame({'a': _rng.normal(size=200), 'b': _rng.normal(size=200), 'c': _rng.normal(size=200)})
+    _df['y'] = 2 * _df['a'] - _df['b'] + _rng.normal(0, .1, 200)
+    return _df
+
+
+@pytest.fixture
+def testdata_models(testdata_reg):
+    _models = hmod.Models(
+        hmod.Model(LinearRegression(), name='lr'), hmod.Model(Ridge(alpha=3.), name='ridge'),
+        hmod.Model(DecisionTreeRegressor(max_depth=3, random_state=0), name='dt'),
+        df=testdata_reg, X_ref=['a', 'b', 'c'], y_ref=['y'], printf=lambda *args, **kwargs: None
+    )
+    return _models
+
+
+# --- tests
+def test_models_score_inplace_change(testdata_models):
+    # scores must reflect inplace changes to df
+    testdata_models.train(k=4, random_state=1, do_print=False, display_score=False)
+    _df_score = testdata_models.score(return_type='df', pivot=True, do_print=False, display_score=False)
+    testdata_models.df.loc[:, 'y'] = testdata_models.df['y'] * -1
+    _df_score_changed = testdata_models.score(return_type='df', pivot=True, do_print=False, display_score=False)
+    assert not _df_score.equals(_df_score_changed)
+
+
+def test_get_feature_importance_inplace_change():
+    # importances must reflect inplace changes to the fitted model
+    _model = SimpleNamespace(feature_importances_=np.array([.2, .5, .3]))
+    _df_importance = hmod.get_feature_importance(_model, ['a', 'b', 'c'])
+    assert _df_importance['feature'].tolist() == ['b', 'c', 'a']
+    _model.feature_importances_[:] = [.6, .1, .3]
+    _df_importance = hmod.get_feature_importance(_model, ['a', 'b', 'c'])
+    assert _df_importance['feature'].tolist() == ['a', 'c', 'b']
+
+
+def test_get_varnames_parameters_only():
+    # local variables of the method are not treated as parameters
+    class _Estimator:
+        def fit(self, X, y, y_test=None):
+            X_test = X
+            return X_test, y, y_test
+
+    _varnames = hmod._get_varnames(_Estimator(), 'fit')
+    assert 'y_test' in _varnames and 'X_test' not in _varnames
+
+
+def test_model_fit_passes_test_data(testdata_reg):
+    # X_test / y_test are passed to model.fit only if it has them as parameters
+    class _Estimator:
+        def fit(self, X, y, X_test=None, y_test=None):
+            self.n_test_ = None if X_test is None else len(X_test)
+            return self
+
+    class _EstimatorLocal:
+        def fit(self, X, y):
+            X_test = X
+            self.n_test_ = len(X_test)
+            return self
+
+    for _estimator, _n_test in [(_Estimator(), 50), (_EstimatorLocal(), 150)]:
+        _model = hmod.Model(_estimator, X_ref=['a', 'b'], y_ref=['y'])
+        _model.fit(df=testdata_reg.iloc[:150], df_test=testdata_reg.iloc[150:])
+        assert _model.model[0].n_test_ == _n_test
+
+
+def test_models_k_cross(testdata_models):
+    # each row is predicted by the model of its own k fold
+    testdata_models.train(k=4, random_state=1, fit_type='k_cross', do_print=False, display_score=False)
+    _df = testdata_models.df
+    assert _df.shape[0] == 200 and _df[['y_lr', 'y_ridge', 'y_dt']].notna().all().all()
+    for _model in testdata_models.models:
+        for _k, _k_model in _model.model.items():
+            _df_k = _df[_df['_k_index'] == _k]
+            np.testing.assert_allclose(_df_k[f"y_{_model.name}"], np.ravel(_k_model.predict(_df_k[['a', 'b', 'c']])))
+    _df_score = testdata_models.score(return_type='df', pivot=True, do_print=False, display_score=False)
+    assert _df_score.notna().all().all()
+
+
+def test_models_fit_n_jobs_keeps_models(testdata_models):
+    # fitting in parallel processes must update the original Model objects
+    _model_lr = testdata_models.models[0]
+    testdata_models.k_split(k=4, random_state=1)
+    testdata_models.fit(do_print=False, n_jobs=2)
+    assert testdata_models.models[0] is _model_lr
+    assert all(hasattr(_k_model, 'coef_') for _k_model in _model_lr.model.values())
+
+
+def test_get_feature_importance_xgb_names():
+    # xgboost feature codes f<i> refer to the position of the predictor, features without splits are missing
+    class _Booster:
+        @staticmethod
+        def get_fscore():
+            return {'f3': 1, 'f0': 10, 'f2': 7}
+
+    class _XGBModel:
+        @property
+        def feature_importances_(self):
+            raise ValueError('feature_importances_ not available')
+
+        @staticmethod
+        def get_booster():
+            return _Booster()
+
+    _df_importance = hmod.get_feature_importance(_XGBModel(), ['a', 'b', 'c', 'd'])
+    assert _df_importance['feature'].tolist() == ['a', 'c', 'd']
+    np.testing.assert_allclose(_df_importance['importance'], np.round([10 / 18, 7 / 18, 1 / 18], 5))
+    _df_importance = hmod.get_feature_importance(_XGBModel(), ['a', 'b', 'c', 'd'], {'ac': ['a', 'c']})
+    assert _df_importance['feature'].tolist() == ['ac', 'd']